@@ -15,6 +15,7 @@ from datetime import datetime
 from pathlib import Path
 import hashlib
 import re
+import struct
 
 try:
     import aiohttp
@@ -27,6 +28,63 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# Palavras-chave que dão bônus de relevância no título
+_VIRAL_TITLE_KEYWORDS = ('viral', 'trending', 'popular', 'engagement', 'likes', 'shares')
+
+# Domínios que recebem bônus de confiabilidade no ranking
+_TRUSTED_SOURCES = ('instagram.com', 'facebook.com', 'twitter.com', 'linkedin.com')
+
+# Marcadores SOF do JPEG que carregam as dimensões (exclui DHT/JPG/DAC)
+_JPEG_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+def _probe_image_header(content: bytes) -> Optional[Tuple[int, int, str]]:
+    """Largura, altura e formato lidos do cabeçalho PNG/JPEG/WebP/GIF (None se não reconhecido)"""
+    try:
+        if content[:8] == b'\x89PNG\r\n\x1a\n':
+            width, height = struct.unpack('>II', content[16:24])
+            return width, height, 'PNG'
+        
+        if content[:6] in (b'GIF87a', b'GIF89a'):
+            width, height = struct.unpack('<HH', content[6:10])
+            return width, height, 'GIF'
+        
+        if content[:4] == b'RIFF' and content[8:12] == b'WEBP':
+            chunk = content[12:16]
+            if chunk == b'VP8 ':
+                width, height = struct.unpack('<HH', content[26:30])
+                return width & 0x3FFF, height & 0x3FFF, 'WEBP'
+            if chunk == b'VP8L':
+                bits = int.from_bytes(content[21:25], 'little')
+                return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1, 'WEBP'
+            if chunk == b'VP8X':
+                width = int.from_bytes(content[24:27], 'little') + 1
+                height = int.from_bytes(content[27:30], 'little') + 1
+                return width, height, 'WEBP'
+            return None
+        
+        if content[:3] == b'\xff\xd8\xff':
+            pos = 2
+            size = len(content)
+            while pos + 9 < size:
+                if content[pos] != 0xFF:
+                    return None
+                marker = content[pos + 1]
+                if marker == 0xFF:
+                    pos += 1
+                    continue
+                if marker in _JPEG_SOF_MARKERS:
+                    height, width = struct.unpack('>HH', content[pos + 5:pos + 9])
+                    return width, height, 'JPEG'
+                segment_length = struct.unpack('>H', content[pos + 2:pos + 4])[0]
+                pos += 2 + segment_length
+            return None
+    except struct.error:
+        return None
+    
+    return None
+
+
 class EnhancedViralImageOptimizer:
     """Otimizador avançado para captura de imagens virais relevantes"""
     
@@ -36,6 +94,8 @@ class EnhancedViralImageOptimizer:
         self.relevance_threshold = 0.8
         self.max_images_per_search = 20
         self.supported_formats = ['.jpg', '.jpeg', '.png', '.webp']
+        # Decodificação completa (PIL verify) só quando integridade for exigida
+        self.verify_image_integrity = os.getenv('VIRAL_IMAGE_VERIFY_INTEGRITY', 'false').lower() == 'true'
         
         # APIs para busca de imagens
         self.search_apis = {
@@ -104,14 +164,8 @@ class EnhancedViralImageOptimizer:
                 bing_images = await self._search_with_bing(query, context)
                 all_images.extend(bing_images)
             
-            # Estratégia 2: Filtrar e validar imagens
-            validated_images = await self._validate_images(all_images, query, context)
-            
-            # Estratégia 3: Ranking por relevância
-            ranked_images = await self._rank_by_relevance(validated_images, query, context)
-            
-            # Estratégia 4: Otimização final
-            optimized_images = await self._optimize_final_selection(ranked_images)
+            # Estratégias 2-4: validação, ranking, deduplicação e seleção final
+            optimized_images = await self._score_and_select(all_images, query, context)
             
             logger.info(f"🎯 Otimização concluída: {len(optimized_images)} imagens de alta qualidade")
             return optimized_images[:8]  # Máximo 8 imagens
@@ -134,20 +188,20 @@ class EnhancedViralImageOptimizer:
                     f"{query} high engagement post"
                 ]
                 
+                # Headers e payload montados uma vez por chave; só 'q' muda por query
+                headers = {
+                    'X-API-KEY': api_key,
+                    'Content-Type': 'application/json'
+                }
+                payload = {
+                    'type': 'images',
+                    'num': 10,
+                    'safe': 'off'
+                }
+                
                 for search_query in queries:
+                    payload['q'] = search_query
                     async with aiohttp.ClientSession() as session:
-                        headers = {
-                            'X-API-KEY': api_key,
-                            'Content-Type': 'application/json'
-                        }
-                        
-                        payload = {
-                            'q': search_query,
-                            'type': 'images',
-                            'num': 10,
-                            'safe': 'off'
-                        }
-                        
                         async with session.post(
                             'https://google.serper.dev/images',
                             headers=headers,
@@ -187,18 +241,18 @@ class EnhancedViralImageOptimizer:
                     f"{query} popular {context}"
                 ]
                 
+                url = "https://www.googleapis.com/customsearch/v1"
+                params = {
+                    'key': config['api_key'],
+                    'cx': config['cse_id'],
+                    'searchType': 'image',
+                    'num': 10,
+                    'safe': 'off',
+                    'imgSize': 'large'
+                }
+                
                 for search_query in queries:
-                    url = "https://www.googleapis.com/customsearch/v1"
-                    params = {
-                        'key': config['api_key'],
-                        'cx': config['cse_id'],
-                        'q': search_query,
-                        'searchType': 'image',
-                        'num': 10,
-                        'safe': 'off',
-                        'imgSize': 'large'
-                    }
-                    
+                    params['q'] = search_query
                     async with aiohttp.ClientSession() as session:
                         async with session.get(url, params=params) as response:
                             if response.status == 200:
@@ -235,15 +289,15 @@ class EnhancedViralImageOptimizer:
                     f"{query} popular instagram"
                 ]
                 
+                headers = {'Ocp-Apim-Subscription-Key': api_key}
+                params = {
+                    'count': 10,
+                    'safeSearch': 'Off',
+                    'size': 'Large'
+                }
+                
                 for search_query in queries:
-                    headers = {'Ocp-Apim-Subscription-Key': api_key}
-                    params = {
-                        'q': search_query,
-                        'count': 10,
-                        'safeSearch': 'Off',
-                        'size': 'Large'
-                    }
-                    
+                    params['q'] = search_query
                     async with aiohttp.ClientSession() as session:
                         async with session.get(
                             'https://api.bing.microsoft.com/v7.0/images/search',
@@ -272,19 +326,27 @@ class EnhancedViralImageOptimizer:
         
         return images
     
-    async def _validate_images(self, images: List[Dict[str, Any]], query: str, context: str) -> List[Dict[str, Any]]:
-        """Valida qualidade e relevância das imagens"""
-        validated = []
+    async def _score_and_select(self, images: List[Dict[str, Any]], query: str, context: str) -> List[Dict[str, Any]]:
+        """Valida, pontua e deduplica as imagens em uma única passagem, depois faz a seleção final"""
+        best_by_url: Dict[str, Dict[str, Any]] = {}
+        validated_count = 0
+        
+        # Palavras da query/contexto calculadas uma vez para todo o lote
+        query_words = set(query.lower().split())
+        context_words = set(context.lower().split()) if context else set()
+        min_relevance = self.relevance_threshold * 0.5  # Threshold mais flexível
+        # Formatos de supported_formats em qualquer ponto da URL (lista vazia não aceita nada)
+        format_re = re.compile('|'.join(map(re.escape, self.supported_formats)) or r'(?!)', re.IGNORECASE)
         
         for img in images:
             try:
                 # Validação 1: URL válida
-                if not img.get('url') or not img['url'].startswith(('http://', 'https://')):
+                url = img.get('url')
+                if not url or not url.startswith(('http://', 'https://')):
                     continue
                 
                 # Validação 2: Formato suportado
-                url_lower = img['url'].lower()
-                if not any(fmt in url_lower for fmt in self.supported_formats):
+                if not format_re.search(url):
                     continue
                 
                 # Validação 3: Dimensões mínimas
@@ -293,10 +355,8 @@ class EnhancedViralImageOptimizer:
                 if width < 200 or height < 200:
                     continue
                 
-                # Validação 4: Relevância do título
+                # Validação 4: Relevância do título (só para imagens já aprovadas acima)
                 title = img.get('title', '').lower()
-                query_words = query.lower().split()
-                context_words = context.lower().split() if context else []
                 
                 relevance_score = 0.0
                 for word in query_words:
@@ -308,77 +368,64 @@ class EnhancedViralImageOptimizer:
                         relevance_score += 0.2
                 
                 # Bonus para palavras-chave virais
-                viral_keywords = ['viral', 'trending', 'popular', 'engagement', 'likes', 'shares']
-                for keyword in viral_keywords:
+                for keyword in _VIRAL_TITLE_KEYWORDS:
                     if keyword in title:
                         relevance_score += 0.1
                 
                 img['relevance_score'] = min(relevance_score, 1.0)
                 
                 # Só aceita se relevância >= threshold
-                if img['relevance_score'] >= self.relevance_threshold * 0.5:  # Threshold mais flexível
-                    validated.append(img)
+                if img['relevance_score'] < min_relevance:
+                    continue
+                validated_count += 1
+                
+                # Ranking: bonus por dimensões
+                score = img['relevance_score']
+                if width >= 800 and height >= 600:
+                    score += 0.2
+                elif width >= 400 and height >= 300:
+                    score += 0.1
+                
+                # Bonus por fonte confiável
+                source = img.get('source', '').lower()
+                if any(trusted in source for trusted in _TRUSTED_SOURCES):
+                    score += 0.15
+                
+                # Bonus por API source
+                api_source = img.get('api_source', '')
+                if api_source == 'google_custom':
+                    score += 0.1
+                elif api_source == 'serper':
+                    score += 0.05
+                
+                img['final_score'] = min(score, 1.0)
+                
+                # Deduplicação por URL mantendo a de maior score
+                current = best_by_url.get(url)
+                if current is None or img['final_score'] > current['final_score']:
+                    best_by_url[url] = img
                 
             except Exception as e:
                 logger.warning(f"⚠️ Erro validando imagem: {e}")
                 continue
         
-        logger.info(f"✅ Validação: {len(validated)}/{len(images)} imagens aprovadas")
-        return validated
-    
-    async def _rank_by_relevance(self, images: List[Dict[str, Any]], query: str, context: str) -> List[Dict[str, Any]]:
-        """Ranking por relevância e qualidade"""
-        
-        for img in images:
-            score = img.get('relevance_score', 0.0)
-            
-            # Bonus por dimensões
-            width = img.get('width', 0)
-            height = img.get('height', 0)
-            if width >= 800 and height >= 600:
-                score += 0.2
-            elif width >= 400 and height >= 300:
-                score += 0.1
-            
-            # Bonus por fonte confiável
-            source = img.get('source', '').lower()
-            trusted_sources = ['instagram.com', 'facebook.com', 'twitter.com', 'linkedin.com']
-            if any(trusted in source for trusted in trusted_sources):
-                score += 0.15
-            
-            # Bonus por API source
-            api_source = img.get('api_source', '')
-            if api_source == 'google_custom':
-                score += 0.1
-            elif api_source == 'serper':
-                score += 0.05
-            
-            img['final_score'] = min(score, 1.0)
+        logger.info(f"✅ Validação: {validated_count}/{len(images)} imagens aprovadas")
         
         # Ordena por score final
-        ranked = sorted(images, key=lambda x: x.get('final_score', 0.0), reverse=True)
+        ranked = sorted(best_by_url.values(), key=lambda x: x['final_score'], reverse=True)
         
-        logger.info(f"🏆 Ranking concluído: melhor score = {ranked[0].get('final_score', 0.0) if ranked else 0.0}")
-        return ranked
+        logger.info(f"🏆 Ranking concluído: melhor score = {ranked[0]['final_score'] if ranked else 0.0}")
+        return self._optimize_final_selection(ranked)
     
-    async def _optimize_final_selection(self, images: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Seleção final otimizada"""
+    def _optimize_final_selection(self, unique_images: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Seleção final otimizada a partir de imagens já ordenadas e sem duplicatas"""
         
-        if not images:
+        if not unique_images:
             return []
         
-        # Remove duplicatas por URL
-        seen_urls = set()
-        unique_images = []
-        
-        for img in images:
-            url = img.get('url', '')
-            if url not in seen_urls:
-                seen_urls.add(url)
-                unique_images.append(img)
-        
         # Diversifica por fonte
         final_selection = []
+        selected_ids = set()
         sources_used = set()
         
         # Primeiro, pega as melhores de cada fonte
@@ -386,17 +433,22 @@ class EnhancedViralImageOptimizer:
             source = img.get('api_source', 'unknown')
             if source not in sources_used and len(final_selection) < 8:
                 final_selection.append(img)
+                selected_ids.add(id(img))
                 sources_used.add(source)
         
         # Depois, completa com as melhores restantes
         for img in unique_images:
-            if img not in final_selection and len(final_selection) < 8:
+            if len(final_selection) >= 8:
+                break
+            if id(img) not in selected_ids:
                 final_selection.append(img)
+                selected_ids.add(id(img))
         
-        # Adiciona metadados finais
+        # Adiciona metadados finais (timestamp único para toda a seleção)
+        optimization_timestamp = datetime.now().isoformat()
         for i, img in enumerate(final_selection):
             img['selection_rank'] = i + 1
-            img['optimization_timestamp'] = datetime.now().isoformat()
+            img['optimization_timestamp'] = optimization_timestamp
             img['quality_rating'] = 'high' if img.get('final_score', 0) > 0.7 else 'medium'
         
         logger.info(f"🎯 Seleção final: {len(final_selection)} imagens otimizadas")
@@ -421,26 +473,32 @@ class EnhancedViralImageOptimizer:
                         async with aiofiles.open(file_path, 'wb') as f:
                             await f.write(content)
                         
-                        # Valida imagem com PIL
+                        # Valida imagem pelo cabeçalho; PIL só como fallback ou para verify
                         try:
-                            with Image.open(file_path) as img:
-                                width, height = img.size
-                                format_type = img.format
-                                
-                                # Atualiza metadados
-                                image_data.update({
-                                    'local_path': str(file_path),
-                                    'filename': filename,
-                                    'actual_width': width,
-                                    'actual_height': height,
-                                    'format': format_type,
-                                    'file_size': len(content),
-                                    'download_success': True,
-                                    'download_timestamp': datetime.now().isoformat()
-                                })
-                                
-                                logger.info(f"✅ Imagem baixada: {filename} ({width}x{height})")
-                                return image_data
+                            header_info = _probe_image_header(content)
+                            if header_info is None or self.verify_image_integrity:
+                                with Image.open(file_path) as img:
+                                    if self.verify_image_integrity:
+                                        img.verify()
+                                    width, height = img.size
+                                    format_type = img.format
+                            else:
+                                width, height, format_type = header_info
+                            
+                            # Atualiza metadados
+                            image_data.update({
+                                'local_path': str(file_path),
+                                'filename': filename,
+                                'actual_width': width,
+                                'actual_height': height,
+                                'format': format_type,
+                                'file_size': len(content),
+                                'download_success': True,
+                                'download_timestamp': datetime.now().isoformat()
+                            })
+                            
+                            logger.info(f"✅ Imagem baixada: {filename} ({width}x{height})")
+                            return image_data
                                 
                         except Exception as e:
                             logger.warning(f"⚠️ Erro validando imagem {filename}: {e}")
@@ -7,34 +7,347 @@ Remove informações brutas, mantém dados estruturados no MD
 Inclui módulos faltantes: CPL, riscos_ameaças, oportunidades_mercado, etc.
 """
 
+import io
 import os
+import gzip
 import re
 import json
+import hashlib
 import logging
-from typing import Dict, List, Any, Optional, Tuple
+import shutil
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from html import escape as html_escape
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime
 from pathlib import Path
 
+try:
+    import xxhash
+    HAS_XXHASH = True
+except ImportError:
+    HAS_XXHASH = False
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
 logger = logging.getLogger(__name__)
 
+# Máximo de relatórios sanitizados mantidos em memória por instância
+_CACHE_MAX_ENTRIES = 32
+
+# HTML/CSS estáticos (módulos inseridos e estilos) ficam em arquivos ao lado do módulo
+_TEMPLATES_DIR = Path(__file__).parent / 'templates'
+
+
+def _load_template(name: str) -> str:
+    """Lê um template estático de _TEMPLATES_DIR (uma vez, na importação do módulo)"""
+    return (_TEMPLATES_DIR / name).read_text(encoding='utf-8')
+
+
+# Padrões de dados brutos removidos do HTML
+_RAW_DATA_PATTERNS = (
+    r'```json[\s\S]*?```',  # Blocos JSON
+    r'```python[\s\S]*?```',  # Código Python
+    r'```[\s\S]*?```',  # Outros blocos de código
+    r'DEBUG:.*?\n',  # Logs de debug
+    r'INFO:.*?\n',  # Logs de info
+    r'ERROR:.*?\n',  # Logs de erro
+    r'TRACE:.*?\n',  # Logs de trace
+    r'\[TIMESTAMP:.*?\]',  # Timestamps técnicos
+    r'API_KEY:.*?\n',  # Chaves de API
+    r'TOKEN:.*?\n',  # Tokens
+    r'RAW_DATA:[\s\S]*?END_RAW',  # Dados brutos marcados
+)
+
+# Dados brutos, linhas vazias excessivas e espaços repetidos em uma única
+# alternação: o HTML é percorrido uma só vez. O lookahead com os primeiros
+# caracteres possíveis descarta rapidamente as posições que não iniciam nenhum
+# padrão, e 'ws' só casa sequências que realmente mudam (não um espaço simples)
+_SANITIZE_RE = re.compile(
+    r'(?=[`\[adeirt\n \t])(?:'
+    '(?P<raw>' + '|'.join(f'(?:{pattern})' for pattern in _RAW_DATA_PATTERNS) + ')'
+    r'|(?P<blanks>\n\s*\n\s*\n)'
+    r'|(?P<ws>\t[ \t]*| [ \t]+)'
+    ')',
+    re.MULTILINE | re.IGNORECASE
+)
+
+# Substituição aplicada para cada grupo de _SANITIZE_RE
+_SANITIZE_REPLACEMENTS = {
+    'raw': '',
+    'blanks': '\n\n',
+    'ws': ' '
+}
+
+# Linhas vazias e espaços duplos que só se formam depois de remover blocos adjacentes
+_BLANK_LINES_RE = re.compile(r'\n\s*\n\s*\n')
+_SPACE_RUN_RE = re.compile(r' {2,}')
+
+
+def _content_hash(html: str) -> int:
+    """Hash rápido do conteúdo HTML, usado só como chave de cache no processo"""
+    # surrogatepass: surrogates isolados (vindos de JSON) não podem derrubar a sanitização
+    data = html.encode('utf-8', 'surrogatepass')
+    if HAS_XXHASH:
+        return xxhash.xxh3_64_intdigest(data)
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), 'big')
+
+
+def _summary_tag_replacement(match: re.Match) -> str:
+    """Substituição de _SUMMARY_TAG_RE: Markdown para p/strong/em, vazio para o resto"""
+    return _SUMMARY_TAG_DISPATCH.get((match.group(2), bool(match.group(1))), '')
+
+
+def _highlight_replacement(match: re.Match) -> str:
+    """Substituição de _HIGHLIGHT_RE: destaca o item de lista e as métricas dentro dele"""
+    metric = match.group(3)
+    if metric is not None:
+        return f'<span class="metric">{metric}</span>'
+    label = _METRIC_RE.sub(r'<span class="metric">\1</span>', match.group(1))
+    text = _METRIC_RE.sub(r'<span class="metric">\1</span>', match.group(2))
+    return f'<li><span class="highlight"><strong>{label}:</strong></span>{text}</li>'
+
+
+# Prefixo dos temporários de gravação atômica (ver _tmp_path)
+_TMP_PREFIX = '.tmp_'
+
+
+def _count_session_files(session_dir: Path) -> int:
+    """Conta as entradas do diretório da sessão, exceto temporários de gravação (_TMP_PREFIX)"""
+    try:
+        with os.scandir(session_dir) as entries:
+            return sum(1 for entry in entries if not entry.name.startswith(_TMP_PREFIX))
+    except (FileNotFoundError, NotADirectoryError):
+        return 0
+
+
+def _find_summary_html(html: str) -> Optional[str]:
+    """Trecho HTML do sumário executivo (o mesmo grupo de _SUMMARY_RE), sem a regex completa no caso comum"""
+    # Caminho rápido só quando a primeira ocorrência do título, em qualquer caixa, é a exata
+    title_match = _SUMMARY_TITLE_RE.search(html)
+    if title_match and title_match.group() == _SUMMARY_TITLE:
+        title = title_match.start()
+        header = None
+        for tag in ('<h2', '<H2'):
+            start = html.rfind(tag, 0, title)
+            header = _SUMMARY_HEADER_RE.match(html, start) if start >= 0 else None
+            if header:
+                break
+        if header:
+            body_start = header.end()
+            # Fim no próximo <h2> (em qualquer caixa); '$' da regex casa antes de um '\n' final
+            body_end = len(html) - 1 if html.endswith('\n') else len(html)
+            for tag in ('<h2', '<H2'):
+                pos = html.find(tag, body_start, body_end)
+                if pos >= 0:
+                    body_end = pos
+            return html[body_start:body_end]
+    
+    summary_match = _SUMMARY_RE.search(html)
+    return summary_match.group(1) if summary_match else None
+
+
+def _tmp_path(path: Path) -> Path:
+    """Arquivo temporário ao lado de path (fora da contagem de _count_session_files)"""
+    return path.with_name(_TMP_PREFIX + path.name)
+
+
+def _write_text_atomic(path: Path, text: str) -> None:
+    """Grava text em um temporário e o move para path (nunca deixa path pela metade)"""
+    tmp = _tmp_path(path)
+    tmp.write_text(text, encoding='utf-8')
+    os.replace(tmp, path)
+
+
+def _remove_if_exists(path: Path) -> None:
+    """Remove path, ignorando se ele não existir"""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _dumps_indented(data) -> str:
+    """JSON indentado com 2 espaços e UTF-8 legível (orjson quando disponível)"""
+    if HAS_ORJSON:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2).decode('utf-8')
+    return json.dumps(data, indent=2, ensure_ascii=False)
+
+
+def _apply_sanitize_re(html: str) -> Tuple[str, bool]:
+    """
+    Aplica _SANITIZE_RE juntando os trechos entre as ocorrências
+    
+    Returns:
+        Tuple[texto, removed_raw]: removed_raw indica se algum dado bruto foi removido
+    """
+    parts = []
+    last = 0
+    removed_raw = False
+    for match in _SANITIZE_RE.finditer(html):
+        group = match.lastgroup
+        if group == 'raw':
+            removed_raw = True
+        parts.append(html[last:match.start()])
+        parts.append(_SANITIZE_REPLACEMENTS[group])
+        last = match.end()
+    parts.append(html[last:])
+    return ''.join(parts), removed_raw
+
+
+def _strip_html_comments(html: str) -> str:
+    """Remove comentários HTML percorrendo os delimitadores com str.find, sem regex"""
+    start = html.find('<!--')
+    if start < 0:
+        return html
+    
+    parts = []
+    pos = 0
+    while start >= 0:
+        end = html.find('-->', start + 4)
+        if end < 0:
+            # Comentário sem fechamento é mantido
+            break
+        parts.append(html[pos:start])
+        pos = end + 3
+        start = html.find('<!--', pos)
+    parts.append(html[pos:])
+    return ''.join(parts)
+
+
+def _strip_tags(text: str) -> str:
+    """Remove as tags <...> restantes, mantendo '<>' e '<' sem fechamento"""
+    start = text.find('<')
+    if start < 0:
+        return text
+    
+    parts = []
+    pos = 0
+    while start >= 0:
+        end = text.find('>', start + 1)
+        if end < 0:
+            break
+        if end == start + 1:
+            # '<>' não é tag
+            start = text.find('<', end)
+            continue
+        parts.append(text[pos:start])
+        pos = end + 1
+        start = text.find('<', pos)
+    parts.append(text[pos:])
+    return ''.join(parts)
+
+
+# Marcadores que indicam dados brutos; sem nenhum deles, extração e remoção são
+# puladas. A busca ignora caixa como _SANITIZE_RE, para ser um superconjunto do
+# que a remoção casaria
+_FAST_MARKERS = (
+    '```', 'DEBUG:', 'INFO:', 'ERROR:', 'TRACE:', '[TIMESTAMP:', '[ID:', '[HASH:',
+    'API_', 'TOKEN:', 'RAW_DATA:', '<!--'
+)
+_FAST_MARKERS_RE = re.compile('|'.join(re.escape(marker) for marker in _FAST_MARKERS), re.IGNORECASE)
+
+# Sem marcadores, linhas vazias e espaços ainda são colapsados por _SANITIZE_RE;
+# estes trechos indicam que há algo a colapsar
+_WHITESPACE_MARKERS = ('\t', '  ', '\n\n', '\n \n', '\r', '\f', '\v', '\xa0')
+
+# Chaves de raw_data, na ordem em que aparecem no MD
+_RAW_DATA_KEYS = ('json_blocks', 'code_blocks', 'debug_logs', 'api_calls', 'technical_data')
+
+# Realces aplicados em _improve_html_formatting: itens de lista com rótulo em
+# negrito e métricas numéricas, em uma única varredura
+_METRIC_RE = re.compile(r'(\d+%|\d+\+|\d+x|R\$ [\d,]+)')
+_HIGHLIGHT_RE = re.compile(r'<li><strong>(.*?):</strong>(.*?)</li>|' + _METRIC_RE.pattern)
+
+# Estilos CSS inline inseridos no início do relatório para melhor apresentação
+_CSS_IMPROVEMENTS = _load_template('report_styles.html')
+
+# Conversão HTML -> Markdown (sumário e análise completa)
+_SUMMARY_RE = re.compile(r'<h2[^>]*>SUMÁRIO EXECUTIVO</h2>(.*?)(?=<h2|$)', re.DOTALL | re.IGNORECASE)
+_SUMMARY_TITLE = 'SUMÁRIO EXECUTIVO'
+_SUMMARY_TITLE_RE = re.compile(re.escape(_SUMMARY_TITLE), re.IGNORECASE)
+_SUMMARY_HEADER_RE = re.compile(r'<h2[^>]*>SUMÁRIO EXECUTIVO</h2>', re.IGNORECASE)
+
+# Limpeza do sumário em uma única varredura: p/strong/em viram Markdown e as
+# demais tags são removidas
+_SUMMARY_TAG_RE = re.compile(r'<(/?)(p|strong|em)>|<[^>]+>')
+_SUMMARY_TAG_DISPATCH = {
+    ('p', False): '', ('p', True): '\n',
+    ('strong', False): '**', ('strong', True): '**',
+    ('em', False): '*', ('em', True): '*',
+}
+
+# Tags convertidas por _convert_html_to_md em uma única varredura
+_MD_TAG_RE = re.compile(r'<(/?)(h[1-4]|strong|em|p|ul|ol|li)\b[^>]*>')
+
+# Texto Markdown emitido para cada (tag, é_fechamento)
+_MD_TAG_DISPATCH = {
+    ('h1', False): '# ', ('h1', True): '',
+    ('h2', False): '## ', ('h2', True): '',
+    ('h3', False): '### ', ('h3', True): '',
+    ('h4', False): '#### ', ('h4', True): '',
+    ('strong', False): '**', ('strong', True): '**',
+    ('em', False): '*', ('em', True): '*',
+    ('p', False): '', ('p', True): '\n',
+    ('ul', False): '', ('ul', True): '',
+    ('ol', False): '', ('ol', True): '',
+    ('li', False): '- ', ('li', True): '',
+}
+
+# Cabeçalho antes do qual os módulos faltantes são inseridos
+_VISUAL_EVIDENCE_ANCHOR = '<h2 id="evidências-visuais">EVIDÊNCIAS VISUAIS</h2>'
+
+# Extração de dados brutos para o MD em uma única varredura; cada grupo
+# nomeado corresponde a uma chave de raw_data
+_EXTRACT_RE = re.compile(
+    r'(?i:```json)(?P<json_blocks>[\s\S]*?)```'
+    r'|(?i:```(?:python|javascript|bash|sql))(?P<code_blocks>[\s\S]*?)```'
+    r'|(?P<debug_logs>DEBUG:.*?)\n'
+    r'|(?P<api_calls>API_[A-Z_]+:.*?)\n'
+    r'|(?P<technical_data>\[TIMESTAMP:.*?\]|\[ID:.*?\]|\[HASH:.*?\])'
+)
+
+# HTML estático do módulo CPL Devastador
+_CPL_MODULE_HTML = _load_template('cpl_module.html')
+
+# HTML estático do módulo Riscos e Ameaças
+_RISKS_MODULE_HTML = _load_template('risks_module.html')
+
+# HTML estático do módulo Oportunidades de Mercado
+_OPPORTUNITIES_MODULE_HTML = _load_template('opportunities_module.html')
+
+# HTML estático do módulo Mapeamento de Tendências
+_TRENDS_MODULE_HTML = _load_template('trends_module.html')
+
+# HTML estático do módulo Análise de Sentimento
+_SENTIMENT_MODULE_HTML = _load_template('sentiment_module.html')
+
+# HTML estático do módulo Análise Viral
+_VIRAL_MODULE_HTML = _load_template('viral_module.html')
+
+# Modelo do HTML genérico, preenchido com um único str.__mod__
+_GENERIC_MODULE_TEMPLATE = _load_template('generic_module.html')
+
+
+@lru_cache(maxsize=256)
+def _render_generic_module_html(module: str) -> str:
+    """HTML genérico (memoizado) para módulos não específicos, com id e título escapados"""
+    
+    return _GENERIC_MODULE_TEMPLATE % {
+        'module_id': html_escape(module.lower()),
+        'module_title': html_escape(module.replace('_', ' ').title()),
+    }
+
+
 class HTMLReportSanitizer:
     """Sanitizador de relatórios HTML para remoção de dados brutos"""
     
     def __init__(self):
-        self.raw_data_patterns = [
-            r'```json[\s\S]*?```',  # Blocos JSON
-            r'```python[\s\S]*?```',  # Código Python
-            r'```[\s\S]*?```',  # Outros blocos de código
-            r'DEBUG:.*?\n',  # Logs de debug
-            r'INFO:.*?\n',  # Logs de info
-            r'ERROR:.*?\n',  # Logs de erro
-            r'TRACE:.*?\n',  # Logs de trace
-            r'\[TIMESTAMP:.*?\]',  # Timestamps técnicos
-            r'API_KEY:.*?\n',  # Chaves de API
-            r'TOKEN:.*?\n',  # Tokens
-            r'RAW_DATA:[\s\S]*?END_RAW',  # Dados brutos marcados
-        ]
-        
         self.required_modules = [
             'cpl_devastador',
             'riscos_ameacas', 
@@ -43,126 +356,320 @@ class HTMLReportSanitizer:
             'analise_sentimento',
             'analise_viral'
         ]
+        self._required_modules_lc = [(module, module.lower()) for module in self.required_modules]
+        
+        # Cache LRU de resultados: (hash do HTML, tamanho do HTML, sessão, need_detailed_md)
+        # -> (html, corpo do MD, itens brutos); cabeçalho e metadados do MD dependem do
+        # momento e são refeitos a cada uso
+        self._cache: "OrderedDict[Tuple[int, int, str, bool], Tuple[str, Optional[str], int]]" = OrderedDict()
+        
+        # Cache em disco para reexecuções entre processos, desativado por padrão: só é
+        # usado com SANITIZER_CACHE_DIR configurado. As entradas guardam o corpo do MD,
+        # com os dados brutos extraídos (inclusive linhas API_/TOKEN:), então o diretório
+        # deve ter o mesmo nível de proteção das sessões. Limitado às
+        # SANITIZER_CACHE_MAX_ENTRIES entradas usadas mais recentemente
+        cache_dir = os.getenv('SANITIZER_CACHE_DIR', '')
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.cache_max_entries = int(os.getenv('SANITIZER_CACHE_MAX_ENTRIES', '64'))
+        
+        # MD detalhado acima deste tamanho (bytes) é salvo como .md.gz no lugar do .md;
+        # desativado por padrão (0), já que muda o nome do arquivo entregue
+        self.md_gzip_threshold = int(os.getenv('SANITIZER_MD_GZIP_THRESHOLD', '0'))
+        
+        # Gerador de HTML por módulo obrigatório
+        self._module_generators = {
+            'cpl_devastador': self._generate_cpl_module_html,
+            'riscos_ameacas': self._generate_risks_module_html,
+            'oportunidades_mercado': self._generate_opportunities_module_html,
+            'mapeamento_tendencias': self._generate_trends_module_html,
+            'analise_sentimento': self._generate_sentiment_module_html,
+            'analise_viral': self._generate_viral_module_html
+        }
         
         logger.info("🧹 HTML Report Sanitizer inicializado")
     
-    def sanitize_html_report(self, html_content: str, session_dir: Path) -> Tuple[str, str]:
+    def sanitize_html_report(self, html_content: str, session_dir: Path, *,
+                             need_detailed_md: bool = True) -> Tuple[str, Optional[str]]:
         """
         Sanitiza relatório HTML removendo dados brutos
         
         Args:
             html_content: Conteúdo HTML original
             session_dir: Diretório da sessão
+            need_detailed_md: Se False, pula a extração de dados brutos e a geração do MD
             
         Returns:
             Tuple[sanitized_html, detailed_md]: HTML limpo e MD detalhado
+            (None quando need_detailed_md=False)
         """
+        # O tamanho na chave protege contra colisão do hash de 64 bits
+        cache_key = (_content_hash(html_content), len(html_content), str(session_dir), need_detailed_md)
+        cached = self._cache.get(cache_key)
+        if cached is not None:
+            self._cache.move_to_end(cache_key)
+            logger.info("♻️ Relatório HTML já sanitizado, usando cache")
+            return self._result_from_cache(cached, session_dir)
+        
+        cache_file = self._get_cache_file(html_content, session_dir, need_detailed_md)
+        cached = self._load_cached_result(cache_file)
+        if cached is not None:
+            self._remember_result(cache_key, cached)
+            logger.info(f"♻️ Relatório HTML já sanitizado, usando cache em disco: {cache_file.name}")
+            return self._result_from_cache(cached, session_dir)
+        
         try:
-            # 1. Extrai dados brutos para MD
-            raw_data = self._extract_raw_data(html_content)
-            
-            # 2. Remove dados brutos do HTML
-            sanitized_html = self._remove_raw_data(html_content)
+            # 1-4. Extrai dados brutos, limpa o HTML, adiciona módulos e formata
+            sanitized_html, raw_data = self._sanitize_html(html_content, session_dir, need_detailed_md)
             
-            # 3. Adiciona módulos faltantes
-            sanitized_html = self._add_missing_modules(sanitized_html, session_dir)
+            # 5. Gera o corpo do MD detalhado com dados brutos (cabeçalho e metadados
+            # são montados em _result_from_cache)
+            md_body = None
+            raw_count = 0
+            if need_detailed_md:
+                summary = self._extract_summary_from_html(sanitized_html)
+                md_body = ''.join(self._iter_md_body_chunks(sanitized_html, raw_data, summary))
+                raw_count = sum(len(v) for v in raw_data.values())
             
-            # 4. Melhora formatação HTML
-            sanitized_html = self._improve_html_formatting(sanitized_html)
-            
-            # 5. Gera MD detalhado com dados brutos
-            detailed_md = self._generate_detailed_md(sanitized_html, raw_data, session_dir)
+            result = (sanitized_html, md_body, raw_count)
+            self._remember_result(cache_key, result)
+            self._store_cached_result(cache_file, result)
             
             logger.info("✅ Relatório HTML sanitizado com sucesso")
-            return sanitized_html, detailed_md
+            return self._result_from_cache(result, session_dir)
             
         except Exception as e:
             logger.error(f"❌ Erro sanitizando relatório HTML: {e}")
-            return html_content, self._generate_fallback_md()
+            return html_content, self._generate_fallback_md() if need_detailed_md else None
     
-    def _extract_raw_data(self, html_content: str) -> Dict[str, List[str]]:
-        """Extrai dados brutos do HTML para preservar no MD"""
+    def sanitize_and_save_reports(self, html_content: str, session_dir: Path) -> Tuple[Optional[Path], Optional[Path]]:
+        """
+        Sanitiza e salva HTML e MD, gravando o MD em streaming (não usa os caches de resultado)
         
-        raw_data = {
-            'json_blocks': [],
-            'code_blocks': [],
-            'debug_logs': [],
-            'api_calls': [],
-            'technical_data': []
-        }
+        Returns:
+            Tuple[html_path, md_path]; em caso de erro, do HTML original e do MD de fallback
+        """
+        md_path = session_dir / "relatorio_completo_detalhado.md"
+        try:
+            sanitized_html, raw_data = self._sanitize_html(html_content, session_dir, True)
+            
+            html_path = session_dir / "relatorio_final_sanitizado.html"
+            
+            # Contagem antes das gravações, para não incluir os próprios relatórios
+            file_count = _count_session_files(session_dir)
+            
+            # HTML em paralelo enquanto o MD é gerado e gravado em streaming
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                html_future = executor.submit(_write_text_atomic, html_path, sanitized_html)
+                md_path = Path(self._generate_detailed_md(sanitized_html, raw_data, session_dir,
+                                                          out_path=md_path, file_count=file_count))
+                html_future.result()
+            
+            logger.info(f"✅ Relatórios sanitizados e salvos: {html_path.name} e {md_path.name}")
+            return html_path, md_path
+            
+        except Exception as e:
+            logger.error(f"❌ Erro sanitizando e salvando relatórios: {e}")
+            _remove_if_exists(_tmp_path(md_path))
+            return self.save_sanitized_reports(html_content, self._generate_fallback_md(), session_dir)
+    
+    def _sanitize_html(self, html_content: str, session_dir: Path,
+                       extract_raw_data: bool) -> Tuple[str, Optional[Dict[str, List[str]]]]:
+        """
+        Executa as etapas de sanitização do HTML
         
-        # Extrai blocos JSON
-        json_matches = re.findall(r'```json([\s\S]*?)```', html_content, re.IGNORECASE)
-        raw_data['json_blocks'] = json_matches
+        Returns:
+            Tuple[sanitized_html, raw_data]: HTML limpo e dados brutos extraídos
+            (None quando extract_raw_data=False)
+        """
+        # HTML já limpo não passa pelas regex de extração/remoção
+        has_raw_markers = _FAST_MARKERS_RE.search(html_content) is not None
+        
+        # 1. Extrai dados brutos para MD
+        raw_data = None
+        if extract_raw_data:
+            if has_raw_markers:
+                raw_data = self._extract_raw_data(html_content)
+            else:
+                raw_data = {key: [] for key in _RAW_DATA_KEYS}
         
-        # Extrai blocos de código
-        code_matches = re.findall(r'```(?:python|javascript|bash|sql)([\s\S]*?)```', html_content, re.IGNORECASE)
-        raw_data['code_blocks'] = code_matches
+        # 2. Remove dados brutos do HTML
+        if has_raw_markers:
+            sanitized_html, anchor_offset = self._remove_raw_data(html_content)
+        else:
+            # Nada a remover, mas linhas vazias e espaços são colapsados como no caminho completo
+            sanitized_html, anchor_offset = html_content, None
+            if any(marker in html_content for marker in _WHITESPACE_MARKERS):
+                sanitized_html, _ = _apply_sanitize_re(html_content)
         
-        # Extrai logs de debug
-        debug_matches = re.findall(r'(DEBUG:.*?)\n', html_content)
-        raw_data['debug_logs'] = debug_matches
+        # 3. Adiciona módulos faltantes
+        sanitized_html = ''.join(self._add_missing_modules(sanitized_html, session_dir, anchor_offset))
         
-        # Extrai chamadas de API
-        api_matches = re.findall(r'(API_[A-Z_]+:.*?)\n', html_content)
-        raw_data['api_calls'] = api_matches
+        # 4. Melhora formatação HTML
+        sanitized_html = self._improve_html_formatting(sanitized_html)
         
-        # Extrai dados técnicos
-        tech_matches = re.findall(r'(\[TIMESTAMP:.*?\]|\[ID:.*?\]|\[HASH:.*?\])', html_content)
-        raw_data['technical_data'] = tech_matches
+        return sanitized_html, raw_data
+    
+    def _result_from_cache(self, cached: Tuple[str, Optional[str], int],
+                           session_dir: Path) -> Tuple[str, Optional[str]]:
+        """Monta (html, md) de um resultado em cache, com cabeçalho e metadados do MD atuais"""
+        sanitized_html, md_body, raw_count = cached
+        if md_body is None:
+            return sanitized_html, None
+        
+        detailed_md = ''.join((
+            self._md_header(session_dir),
+            md_body,
+            self._md_metadata(session_dir, _count_session_files(session_dir), raw_count),
+        ))
+        return sanitized_html, detailed_md
+    
+    def _remember_result(self, cache_key: Tuple[int, int, str, bool], result: Tuple[str, Optional[str], int]):
+        """Guarda o resultado no cache LRU em memória"""
+        self._cache[cache_key] = result
+        if len(self._cache) > _CACHE_MAX_ENTRIES:
+            self._cache.popitem(last=False)
+    
+    def _get_cache_file(self, html_content: str, session_dir: Path, need_detailed_md: bool) -> Optional[Path]:
+        """Caminho do cache em disco endereçado pelo conteúdo (None se desativado)"""
+        if self.cache_dir is None:
+            return None
+        
+        digest = hashlib.blake2b(html_content.encode('utf-8', 'surrogatepass'), digest_size=16)
+        digest.update(f'\0{session_dir}\0{need_detailed_md}'.encode('utf-8', 'surrogatepass'))
+        return self.cache_dir / f"{digest.hexdigest()}.json"
+    
+    def _load_cached_result(self, cache_file: Optional[Path]) -> Optional[Tuple[str, Optional[str], int]]:
+        """Lê um resultado do cache em disco, se existir"""
+        if cache_file is None or not cache_file.exists():
+            return None
         
-        logger.info(f"📊 Dados brutos extraídos: {sum(len(v) for v in raw_data.values())} itens")
-        return raw_data
+        try:
+            data = json.loads(cache_file.read_text(encoding='utf-8'))
+            result = data['html'], data['md_body'], data['raw_count']
+            # Marca a entrada como usada recentemente para o descarte por idade
+            os.utime(cache_file)
+            return result
+        except Exception as e:
+            logger.warning(f"⚠️ Cache de sanitização inválido ({cache_file.name}): {e}")
+            return None
     
-    def _remove_raw_data(self, html_content: str) -> str:
-        """Remove dados brutos do HTML"""
+    def _store_cached_result(self, cache_file: Optional[Path], result: Tuple[str, Optional[str], int]):
+        """Grava o resultado no cache em disco; falhas não interrompem a sanitização"""
+        if cache_file is None:
+            return
         
-        sanitized = html_content
+        sanitized_html, md_body, raw_count = result
+        try:
+            cache_file.parent.mkdir(parents=True, exist_ok=True)
+            _write_text_atomic(cache_file, json.dumps(
+                {'html': sanitized_html, 'md_body': md_body, 'raw_count': raw_count}, ensure_ascii=False
+            ))
+            self._prune_disk_cache()
+        except Exception as e:
+            logger.warning(f"⚠️ Não foi possível gravar cache de sanitização: {e}")
+    
+    def _prune_disk_cache(self):
+        """Remove as entradas menos usadas recentemente além de cache_max_entries"""
+        with os.scandir(self.cache_dir) as entries:
+            cache_files = [
+                (entry.stat().st_mtime, entry.path) for entry in entries
+                if entry.name.endswith('.json') and not entry.name.startswith('.')
+            ]
+        
+        excess = len(cache_files) - max(self.cache_max_entries, 0)
+        if excess <= 0:
+            return
+        
+        cache_files.sort()
+        for _, path in cache_files[:excess]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+    
+    def _extract_raw_data(self, html_content: str) -> Dict[str, List[str]]:
+        """Extrai dados brutos do HTML para preservar no MD"""
         
-        # Remove padrões de dados brutos
-        for pattern in self.raw_data_patterns:
-            sanitized = re.sub(pattern, '', sanitized, flags=re.MULTILINE | re.IGNORECASE)
+        raw_data = {key: [] for key in _RAW_DATA_KEYS}
         
-        # Remove linhas vazias excessivas
-        sanitized = re.sub(r'\n\s*\n\s*\n', '\n\n', sanitized)
+        # Extrai blocos JSON, código, logs de debug, chamadas de API e dados técnicos
+        for match in _EXTRACT_RE.finditer(html_content):
+            group = match.lastgroup
+            raw_data[group].append(match.group(group))
         
-        # Remove espaços em branco excessivos
-        sanitized = re.sub(r'[ \t]+', ' ', sanitized)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("📊 Dados brutos extraídos: %d itens", sum(len(v) for v in raw_data.values()))
+        return raw_data
+    
+    def _remove_raw_data(self, html_content: str) -> Tuple[str, int]:
+        """
+        Remove dados brutos do HTML
+        
+        Returns:
+            Tuple[sanitized, anchor_offset]: HTML limpo e posição do cabeçalho de
+            evidências visuais nele (-1 se ausente)
+        """
         
         # Remove comentários HTML técnicos
-        sanitized = re.sub(r'<!--.*?-->', '', sanitized, flags=re.DOTALL)
+        sanitized = _strip_html_comments(html_content)
+        
+        # Remove dados brutos, colapsa linhas vazias e espaços excessivos
+        # em uma única varredura
+        sanitized, removed_raw = _apply_sanitize_re(sanitized)
+        
+        # Blocos removidos podem juntar linhas vazias (inclusive só com espaços) ou
+        # espaços dos dois lados; só há o que colapsar de novo se algo foi removido
+        if removed_raw:
+            sanitized = _BLANK_LINES_RE.sub('\n\n', sanitized)
+            if '  ' in sanitized:
+                sanitized = _SPACE_RUN_RE.sub(' ', sanitized)
+        
+        anchor_offset = sanitized.find(_VISUAL_EVIDENCE_ANCHOR)
         
         logger.info("🧹 Dados brutos removidos do HTML")
-        return sanitized
+        return sanitized, anchor_offset
     
-    def _add_missing_modules(self, html_content: str, session_dir: Path) -> str:
-        """Adiciona módulos faltantes ao relatório"""
+    def _add_missing_modules(self, html_content: str, session_dir: Path,
+                             anchor_offset: Optional[int] = None) -> List[str]:
+        """
+        Adiciona módulos faltantes ao relatório
+        
+        Args:
+            html_content: HTML sanitizado
+            session_dir: Diretório da sessão
+            anchor_offset: Posição já conhecida do cabeçalho de evidências visuais
+                (-1 se ausente); calculada aqui quando não informada
+            
+        Returns:
+            Partes do HTML final, para serem unidas com um único ''.join()
+        """
         
-        # Verifica quais módulos estão faltando
-        missing_modules = []
-        for module in self.required_modules:
-            if module.lower() not in html_content.lower():
-                missing_modules.append(module)
+        # Verifica quais módulos estão faltando (HTML em minúsculas uma única vez)
+        html_lower = html_content.lower()
+        missing_modules = [
+            module for module, module_lc in self._required_modules_lc
+            if module_lc not in html_lower
+        ]
         
         if not missing_modules:
             logger.info("✅ Todos os módulos obrigatórios estão presentes")
-            return html_content
+            return [html_content]
         
         # Gera HTML dos módulos faltantes
         modules_html = self._generate_missing_modules_html(missing_modules, session_dir)
         
         # Insere antes da seção de evidências visuais
-        if "EVIDÊNCIAS VISUAIS" in html_content:
-            html_content = html_content.replace(
-                '<h2 id="evidências-visuais">EVIDÊNCIAS VISUAIS</h2>',
-                f'{modules_html}\n<h2 id="evidências-visuais">EVIDÊNCIAS VISUAIS</h2>'
-            )
+        if anchor_offset is None:
+            anchor_offset = html_content.find(_VISUAL_EVIDENCE_ANCHOR)
+        
+        if anchor_offset >= 0:
+            parts = [html_content[:anchor_offset], modules_html, '\n', html_content[anchor_offset:]]
         else:
             # Adiciona no final
-            html_content += modules_html
+            parts = [html_content, modules_html]
         
-        logger.info(f"➕ Adicionados {len(missing_modules)} módulos faltantes")
-        return html_content
+        logger.info("➕ Adicionados %d módulos faltantes", len(missing_modules))
+        return parts
     
     def _generate_missing_modules_html(self, missing_modules: List[str], session_dir: Path) -> str:
         """Gera HTML dos módulos faltantes"""
@@ -170,18 +677,9 @@ class HTMLReportSanitizer:
         modules_html = []
         
         for module in missing_modules:
-            if module == 'cpl_devastador':
-                html = self._generate_cpl_module_html(session_dir)
-            elif module == 'riscos_ameacas':
-                html = self._generate_risks_module_html(session_dir)
-            elif module == 'oportunidades_mercado':
-                html = self._generate_opportunities_module_html(session_dir)
-            elif module == 'mapeamento_tendencias':
-                html = self._generate_trends_module_html(session_dir)
-            elif module == 'analise_sentimento':
-                html = self._generate_sentiment_module_html(session_dir)
-            elif module == 'analise_viral':
-                html = self._generate_viral_module_html(session_dir)
+            generator = self._module_generators.get(module)
+            if generator:
+                html = generator(session_dir)
             else:
                 html = self._generate_generic_module_html(module)
             
@@ -192,579 +690,126 @@ class HTMLReportSanitizer:
     def _generate_cpl_module_html(self, session_dir: Path) -> str:
         """Gera HTML do módulo CPL Devastador"""
         
-        return """
-<hr />
-<h2 id="protocolo-cpl-devastador">🎯 PROTOCOLO CPL DEVASTADOR</h2>
-<p><strong>Status:</strong> Módulo Integrado | <strong>Versão:</strong> 3.0 Enhanced</p>
-
-<h3 id="cpl-1-oportunidade-paralisante">🔥 CPL 1 - A Oportunidade Paralisante</h3>
-<div style="background: #fff3cd; padding: 15px; border-radius: 8px; margin: 15px 0;">
-    <p><strong>Objetivo:</strong> Criar urgência através da escassez de oportunidade</p>
-    <p><strong>Estratégia:</strong> Apresentar uma janela de oportunidade única que está se fechando</p>
-    <p><strong>Gatilho Mental:</strong> FOMO (Fear of Missing Out) + Escassez Temporal</p>
-</div>
-
-<h3 id="cpl-2-transformacao-impossivel">⚡ CPL 2 - A Transformação Impossível</h3>
-<div style="background: #e3f2fd; padding: 15px; border-radius: 8px; margin: 15px 0;">
-    <p><strong>Objetivo:</strong> Demonstrar resultados extraordinários aparentemente impossíveis</p>
-    <p><strong>Estratégia:</strong> Casos de sucesso que desafiam a lógica convencional</p>
-    <p><strong>Gatilho Mental:</strong> Curiosidade + Prova Social Extrema</p>
-</div>
-
-<h3 id="cpl-3-caminho-revolucionario">🚀 CPL 3 - O Caminho Revolucionário</h3>
-<div style="background: #f3e5f5; padding: 15px; border-radius: 8px; margin: 15px 0;">
-    <p><strong>Objetivo:</strong> Apresentar método único que quebra paradigmas</p>
-    <p><strong>Estratégia:</strong> Revelar "segredo" que a indústria não quer que você saiba</p>
-    <p><strong>Gatilho Mental:</strong> Exclusividade + Autoridade + Conspiração</p>
-</div>
-
-<h3 id="cpl-4-decisao-inevitavel">💎 CPL 4 - A Decisão Inevitável</h3>
-<div style="background: #e8f5e8; padding: 15px; border-radius: 8px; margin: 15px 0;">
-    <p><strong>Objetivo:</strong> Tornar a compra a única escolha lógica</p>
-    <p><strong>Estratégia:</strong> Eliminar todas as objeções e alternativas</p>
-    <p><strong>Gatilho Mental:</strong> Lógica Irrefutável + Garantia Total</p>
-</div>
-
-<div style="background: #d4edda; padding: 20px; border-radius: 8px; margin: 20px 0;">
-    <h4>📊 Métricas de Performance dos CPLs</h4>
-    <ul>
-        <li><strong>Taxa de Conversão Média:</strong> 15-25% (vs. 2-5% padrão)</li>
-        <li><strong>Tempo de Decisão:</strong> Reduzido em 60%</li>
-        <li><strong>Valor Percebido:</strong> Aumentado em 300%</li>
-        <li><strong>Objeções Neutralizadas:</strong> 85% das objeções comuns</li>
-    </ul>
-</div>
-"""
+        return _CPL_MODULE_HTML
     
     def _generate_risks_module_html(self, session_dir: Path) -> str:
         """Gera HTML do módulo Riscos e Ameaças"""
         
-        return """
-<hr />
-<h2 id="avaliacao-riscos-ameacas">⚠️ AVALIAÇÃO DE RISCOS E AMEAÇAS</h2>
-<p><strong>Análise:</strong> Identificação proativa de riscos de mercado e ameaças competitivas</p>
-
-<div style="display: grid; grid-template-columns: 1fr 1fr; gap: 20px; margin: 20px 0;">
-    <div style="background: #f8d7da; padding: 15px; border-radius: 8px;">
-        <h4>🔴 Riscos Críticos</h4>
-        <ul>
-            <li><strong>Saturação de Mercado:</strong> Aumento de 40% na concorrência</li>
-            <li><strong>Mudanças Regulatórias:</strong> Novas leis de proteção de dados</li>
-            <li><strong>Volatilidade Econômica:</strong> Inflação impactando poder de compra</li>
-            <li><strong>Dependência Tecnológica:</strong> Mudanças em algoritmos de plataformas</li>
-        </ul>
-    </div>
-    <div style="background: #fff3cd; padding: 15px; border-radius: 8px;">
-        <h4>🟡 Riscos Moderados</h4>
-        <ul>
-            <li><strong>Sazonalidade:</strong> Variações de demanda por período</li>
-            <li><strong>Rotatividade de Equipe:</strong> Perda de conhecimento especializado</li>
-            <li><strong>Obsolescência Tecnológica:</strong> Ferramentas ficando desatualizadas</li>
-            <li><strong>Flutuação Cambial:</strong> Impacto em ferramentas internacionais</li>
-        </ul>
-    </div>
-</div>
-
-<h3 id="matriz-risco-impacto">📊 Matriz Risco x Impacto</h3>
-<div style="background: #e9ecef; padding: 20px; border-radius: 8px; margin: 15px 0;">
-    <table style="width: 100%; border-collapse: collapse;">
-        <tr style="background: #6c757d; color: white;">
-            <th style="padding: 10px; border: 1px solid #ddd;">Risco</th>
-            <th style="padding: 10px; border: 1px solid #ddd;">Probabilidade</th>
-            <th style="padding: 10px; border: 1px solid #ddd;">Impacto</th>
-            <th style="padding: 10px; border: 1px solid #ddd;">Prioridade</th>
-        </tr>
-        <tr>
-            <td style="padding: 10px; border: 1px solid #ddd;">Saturação de Mercado</td>
-            <td style="padding: 10px; border: 1px solid #ddd;">Alta (80%)</td>
-            <td style="padding: 10px; border: 1px solid #ddd;">Alto</td>
-            <td style="padding: 10px; border: 1px solid #ddd; background: #f8d7da;">🔴 Crítica</td>
-        </tr>
-        <tr>
-            <td style="padding: 10px; border: 1px solid #ddd;">Mudanças Regulatórias</td>
-            <td style="padding: 10px; border: 1px solid #ddd;">Média (60%)</td>
-            <td style="padding: 10px; border: 1px solid #ddd;">Alto</td>
-            <td style="padding: 10px; border: 1px solid #ddd; background: #fff3cd;">🟡 Alta</td>
-        </tr>
-        <tr>
-            <td style="padding: 10px; border: 1px solid #ddd;">Volatilidade Econômica</td>
-            <td style="padding: 10px; border: 1px solid #ddd;">Alta (75%)</td>
-            <td style="padding: 10px; border: 1px solid #ddd;">Médio</td>
-            <td style="padding: 10px; border: 1px solid #ddd; background: #fff3cd;">🟡 Alta</td>
-        </tr>
-    </table>
-</div>
-
-<h3 id="plano-mitigacao">🛡️ Plano de Mitigação</h3>
-<div style="background: #d1ecf1; padding: 15px; border-radius: 8px; margin: 15px 0;">
-    <h4>Estratégias de Proteção</h4>
-    <ol>
-        <li><strong>Diversificação de Canais:</strong> Reduzir dependência de uma única plataforma</li>
-        <li><strong>Reserva de Emergência:</strong> Capital para 6 meses de operação</li>
-        <li><strong>Monitoramento Contínuo:</strong> Alertas automáticos para mudanças de mercado</li>
-        <li><strong>Parcerias Estratégicas:</strong> Alianças para fortalecer posição competitiva</li>
-        <li><strong>Inovação Constante:</strong> Investimento em P&D para manter vantagem</li>
-    </ol>
-</div>
-"""
+        return _RISKS_MODULE_HTML
     
     def _generate_opportunities_module_html(self, session_dir: Path) -> str:
         """Gera HTML do módulo Oportunidades de Mercado"""
         
-        return """
-<hr />
-<h2 id="oportunidades-mercado">🎯 IDENTIFICAÇÃO DE OPORTUNIDADES DE MERCADO</h2>
-<p><strong>Análise:</strong> Mapeamento de oportunidades emergentes e nichos inexplorados</p>
-
-<div style="display: grid; grid-template-columns: repeat(auto-fit, minmax(300px, 1fr)); gap: 20px; margin: 20px 0;">
-    <div style="background: #d4edda; padding: 15px; border-radius: 8px;">
-        <h4>🚀 Oportunidades Imediatas</h4>
-        <ul>
-            <li><strong>Mercado Emergente:</strong> Crescimento de 150% em nichos específicos</li>
-            <li><strong>Lacuna Competitiva:</strong> Poucos players especializados</li>
-            <li><strong>Demanda Reprimida:</strong> 40% do público sem solução adequada</li>
-            <li><strong>Timing Perfeito:</strong> Convergência de fatores favoráveis</li>
-        </ul>
-    </div>
-    <div style="background: #cce5ff; padding: 15px; border-radius: 8px;">
-        <h4>📈 Tendências de Crescimento</h4>
-        <ul>
-            <li><strong>Digitalização Acelerada:</strong> +200% em adoção digital</li>
-            <li><strong>Personalização:</strong> Demanda por soluções customizadas</li>
-            <li><strong>Sustentabilidade:</strong> Preferência por marcas conscientes</li>
-            <li><strong>Experiência do Cliente:</strong> Foco em jornada omnichannel</li>
-        </ul>
-    </div>
-    <div style="background: #f0e6ff; padding: 15px; border-radius: 8px;">
-        <h4>💡 Nichos Inexplorados</h4>
-        <ul>
-            <li><strong>Micro-Segmentos:</strong> Públicos altamente específicos</li>
-            <li><strong>Intersecções de Mercado:</strong> Combinação de setores</li>
-            <li><strong>Geografias Emergentes:</strong> Regiões com potencial</li>
-            <li><strong>Faixas Etárias Negligenciadas:</strong> Gerações subestimadas</li>
-        </ul>
-    </div>
-</div>
-
-<h3 id="matriz-oportunidades">🎯 Matriz de Oportunidades</h3>
-<div style="background: #f8f9fa; padding: 20px; border-radius: 8px; margin: 15px 0;">
-    <table style="width: 100%; border-collapse: collapse;">
-        <tr style="background: #28a745; color: white;">
-            <th style="padding: 10px; border: 1px solid #ddd;">Oportunidade</th>
-            <th style="padding: 10px; border: 1px solid #ddd;">Potencial</th>
-            <th style="padding: 10px; border: 1px solid #ddd;">Facilidade</th>
-            <th style="padding: 10px; border: 1px solid #ddd;">Prioridade</th>
-        </tr>
-        <tr>
-            <td style="padding: 10px; border: 1px solid #ddd;">Mercado B2B Especializado</td>
-            <td style="padding: 10px; border: 1px solid #ddd;">Alto (R$ 2M+)</td>
-            <td style="padding: 10px; border: 1px solid #ddd;">Média</td>
-            <td style="padding: 10px; border: 1px solid #ddd; background: #d4edda;">🟢 Alta</td>
-        </tr>
-        <tr>
-            <td style="padding: 10px; border: 1px solid #ddd;">Automação de Processos</td>
-            <td style="padding: 10px; border: 1px solid #ddd;">Muito Alto (R$ 5M+)</td>
-            <td style="padding: 10px; border: 1px solid #ddd;">Baixa</td>
-            <td style="padding: 10px; border: 1px solid #ddd; background: #fff3cd;">🟡 Média</td>
-        </tr>
-        <tr>
-            <td style="padding: 10px; border: 1px solid #ddd;">Consultoria Premium</td>
-            <td style="padding: 10px; border: 1px solid #ddd;">Alto (R$ 1.5M+)</td>
-            <td style="padding: 10px; border: 1px solid #ddd;">Alta</td>
-            <td style="padding: 10px; border: 1px solid #ddd; background: #d4edda;">🟢 Alta</td>
-        </tr>
-    </table>
-</div>
-
-<h3 id="roadmap-exploracao">🗺️ Roadmap de Exploração</h3>
-<div style="background: #e7f3ff; padding: 15px; border-radius: 8px; margin: 15px 0;">
-    <h4>Fases de Implementação</h4>
-    <ol>
-        <li><strong>Fase 1 (0-3 meses):</strong> Validação de oportunidades de alta facilidade</li>
-        <li><strong>Fase 2 (3-6 meses):</strong> Desenvolvimento de MVPs para nichos promissores</li>
-        <li><strong>Fase 3 (6-12 meses):</strong> Escalonamento das oportunidades validadas</li>
-        <li><strong>Fase 4 (12+ meses):</strong> Expansão para mercados adjacentes</li>
-    </ol>
-</div>
-"""
+        return _OPPORTUNITIES_MODULE_HTML
     
     def _generate_trends_module_html(self, session_dir: Path) -> str:
         """Gera HTML do módulo Mapeamento de Tendências"""
         
-        return """
-<hr />
-<h2 id="mapeamento-tendencias">📊 MAPEAMENTO DE TENDÊNCIAS E PREVISÕES</h2>
-<p><strong>Análise:</strong> Identificação de tendências emergentes e previsões de mercado baseadas em dados</p>
-
-<div style="display: grid; grid-template-columns: 1fr 1fr; gap: 20px; margin: 20px 0;">
-    <div style="background: #e8f4fd; padding: 15px; border-radius: 8px;">
-        <h4>📈 Tendências Ascendentes</h4>
-        <ul>
-            <li><strong>IA Generativa:</strong> Crescimento de 300% em adoção</li>
-            <li><strong>Automação No-Code:</strong> Democratização da tecnologia</li>
-            <li><strong>Sustentabilidade Digital:</strong> Pegada de carbono zero</li>
-            <li><strong>Experiências Imersivas:</strong> AR/VR mainstream</li>
-            <li><strong>Personalização Hiper-Segmentada:</strong> 1:1 marketing</li>
-        </ul>
-    </div>
-    <div style="background: #fff0f0; padding: 15px; border-radius: 8px;">
-        <h4>📉 Tendências Declinantes</h4>
-        <ul>
-            <li><strong>Marketing de Massa:</strong> Eficácia reduzida em 60%</li>
-            <li><strong>Cookies Third-Party:</strong> Fim da era de tracking</li>
-            <li><strong>Conteúdo Genérico:</strong> Perda de relevância</li>
-            <li><strong>Canais Tradicionais:</strong> Migração para digital</li>
-            <li><strong>Processos Manuais:</strong> Substituição por automação</li>
-        </ul>
-    </div>
-</div>
-
-<h3 id="ciclo-vida-tendencias">🔄 Ciclo de Vida das Tendências</h3>
-<div style="background: #f8f9fa; padding: 20px; border-radius: 8px; margin: 15px 0;">
-    <div style="display: grid; grid-template-columns: repeat(4, 1fr); gap: 15px; text-align: center;">
-        <div style="background: #d1ecf1; padding: 15px; border-radius: 8px;">
-            <h5>🌱 Emergente</h5>
-            <p><strong>IA Conversacional</strong></p>
-            <p>Adoção: 15%</p>
-            <p>Tempo: 0-2 anos</p>
-        </div>
-        <div style="background: #d4edda; padding: 15px; border-radius: 8px;">
-            <h5>🚀 Crescimento</h5>
-            <p><strong>Automação Marketing</strong></p>
-            <p>Adoção: 45%</p>
-            <p>Tempo: 2-5 anos</p>
-        </div>
-        <div style="background: #fff3cd; padding: 15px; border-radius: 8px;">
-            <h5>📊 Maturidade</h5>
-            <p><strong>Social Media Marketing</strong></p>
-            <p>Adoção: 85%</p>
-            <p>Tempo: 5-10 anos</p>
-        </div>
-        <div style="background: #f8d7da; padding: 15px; border-radius: 8px;">
-            <h5>📉 Declínio</h5>
-            <p><strong>Email Marketing Tradicional</strong></p>
-            <p>Adoção: 60% (decrescente)</p>
-            <p>Tempo: 10+ anos</p>
-        </div>
-    </div>
-</div>
-
-<h3 id="previsoes-2025">🔮 Previsões para 2025</h3>
-<div style="background: #e7f3ff; padding: 15px; border-radius: 8px; margin: 15px 0;">
-    <h4>Principais Mudanças Esperadas</h4>
-    <ul>
-        <li><strong>IA Onipresente:</strong> 90% das empresas usando IA em marketing</li>
-        <li><strong>Privacidade First:</strong> Consentimento explícito obrigatório</li>
-        <li><strong>Voz e Visual:</strong> 70% das buscas por voz ou imagem</li>
-        <li><strong>Micro-Influenciadores:</strong> Dominância sobre mega-influenciadores</li>
-        <li><strong>Realidade Aumentada:</strong> 50% do e-commerce com AR</li>
-        <li><strong>Sustentabilidade:</strong> Critério decisivo para 80% dos consumidores</li>
-    </ul>
-</div>
-
-<h3 id="impacto-estrategico">⚡ Impacto Estratégico</h3>
-<div style="background: #f0f8ff; padding: 15px; border-radius: 8px; margin: 15px 0;">
-    <h4>Recomendações Baseadas em Tendências</h4>
-    <ol>
-        <li><strong>Investir em IA:</strong> Prioridade máxima para automação e personalização</li>
-        <li><strong>Preparar para Cookieless:</strong> Estratégias de first-party data</li>
-        <li><strong>Desenvolver Conteúdo Imersivo:</strong> AR/VR como diferencial</li>
-        <li><strong>Focar em Sustentabilidade:</strong> Posicionamento responsável</li>
-        <li><strong>Construir Comunidades:</strong> Engajamento profundo vs. alcance amplo</li>
-    </ol>
-</div>
-"""
+        return _TRENDS_MODULE_HTML
     
     def _generate_sentiment_module_html(self, session_dir: Path) -> str:
         """Gera HTML do módulo Análise de Sentimento"""
         
-        return """
-<hr />
-<h2 id="analise-sentimento-detalhada">💭 ANÁLISE DE SENTIMENTO DETALHADA</h2>
-<p><strong>Metodologia:</strong> Análise de sentimento baseada em NLP e machine learning aplicada ao conteúdo coletado</p>
-
-<div style="display: grid; grid-template-columns: repeat(3, 1fr); gap: 20px; margin: 20px 0;">
-    <div style="background: #d4edda; padding: 15px; border-radius: 8px; text-align: center;">
-        <h4>😊 Sentimento Positivo</h4>
-        <div style="font-size: 2em; color: #28a745;">68%</div>
-        <p><strong>Indicadores:</strong></p>
-        <ul style="text-align: left; font-size: 0.9em;">
-            <li>Palavras de aprovação</li>
-            <li>Emojis positivos</li>
-            <li>Recomendações</li>
-            <li>Elogios diretos</li>
-        </ul>
-    </div>
-    <div style="background: #fff3cd; padding: 15px; border-radius: 8px; text-align: center;">
-        <h4>😐 Sentimento Neutro</h4>
-        <div style="font-size: 2em; color: #ffc107;">22%</div>
-        <p><strong>Indicadores:</strong></p>
-        <ul style="text-align: left; font-size: 0.9em;">
-            <li>Informações factuais</li>
-            <li>Perguntas técnicas</li>
-            <li>Comentários descritivos</li>
-            <li>Dúvidas neutras</li>
-        </ul>
-    </div>
-    <div style="background: #f8d7da; padding: 15px; border-radius: 8px; text-align: center;">
-        <h4>😞 Sentimento Negativo</h4>
-        <div style="font-size: 2em; color: #dc3545;">10%</div>
-        <p><strong>Indicadores:</strong></p>
-        <ul style="text-align: left; font-size: 0.9em;">
-            <li>Críticas construtivas</li>
-            <li>Reclamações específicas</li>
-            <li>Frustrações pontuais</li>
-            <li>Sugestões de melhoria</li>
-        </ul>
-    </div>
-</div>
-
-<h3 id="analise-emocional">🎭 Análise Emocional Profunda</h3>
-<div style="background: #f8f9fa; padding: 20px; border-radius: 8px; margin: 15px 0;">
-    <div style="display: grid; grid-template-columns: 1fr 1fr; gap: 20px;">
-        <div>
-            <h5>🔥 Emoções Dominantes</h5>
-            <ul>
-                <li><strong>Entusiasmo:</strong> 35% - Expectativa alta</li>
-                <li><strong>Confiança:</strong> 28% - Credibilidade estabelecida</li>
-                <li><strong>Curiosidade:</strong> 20% - Interesse genuíno</li>
-                <li><strong>Satisfação:</strong> 12% - Resultados alcançados</li>
-                <li><strong>Ansiedade:</strong> 5% - Urgência de solução</li>
-            </ul>
-        </div>
-        <div>
-            <h5>📊 Intensidade Emocional</h5>
-            <ul>
-                <li><strong>Muito Alta:</strong> 25% - Engajamento máximo</li>
-                <li><strong>Alta:</strong> 40% - Interesse forte</li>
-                <li><strong>Moderada:</strong> 25% - Atenção casual</li>
-                <li><strong>Baixa:</strong> 8% - Interesse mínimo</li>
-                <li><strong>Neutra:</strong> 2% - Sem engajamento</li>
-            </ul>
-        </div>
-    </div>
-</div>
-
-<h3 id="palavras-chave-sentimento">🔤 Palavras-Chave por Sentimento</h3>
-<div style="display: grid; grid-template-columns: 1fr 1fr 1fr; gap: 15px; margin: 15px 0;">
-    <div style="background: #e8f5e8; padding: 15px; border-radius: 8px;">
-        <h5>✅ Positivas Mais Frequentes</h5>
-        <div style="display: flex; flex-wrap: wrap; gap: 5px;">
-            <span style="background: #28a745; color: white; padding: 3px 8px; border-radius: 15px; font-size: 0.8em;">excelente</span>
-            <span style="background: #28a745; color: white; padding: 3px 8px; border-radius: 15px; font-size: 0.8em;">incrível</span>
-            <span style="background: #28a745; color: white; padding: 3px 8px; border-radius: 15px; font-size: 0.8em;">perfeito</span>
-            <span style="background: #28a745; color: white; padding: 3px 8px; border-radius: 15px; font-size: 0.8em;">recomendo</span>
-            <span style="background: #28a745; color: white; padding: 3px 8px; border-radius: 15px; font-size: 0.8em;">fantástico</span>
-        </div>
-    </div>
-    <div style="background: #fff8e1; padding: 15px; border-radius: 8px;">
-        <h5>➖ Neutras Mais Frequentes</h5>
-        <div style="display: flex; flex-wrap: wrap; gap: 5px;">
-            <span style="background: #ffc107; color: black; padding: 3px 8px; border-radius: 15px; font-size: 0.8em;">informação</span>
-            <span style="background: #ffc107; color: black; padding: 3px 8px; border-radius: 15px; font-size: 0.8em;">dúvida</span>
-            <span style="background: #ffc107; color: black; padding: 3px 8px; border-radius: 15px; font-size: 0.8em;">pergunta</span>
-            <span style="background: #ffc107; color: black; padding: 3px 8px; border-radius: 15px; font-size: 0.8em;">detalhes</span>
-            <span style="background: #ffc107; color: black; padding: 3px 8px; border-radius: 15px; font-size: 0.8em;">esclarecimento</span>
-        </div>
-    </div>
-    <div style="background: #ffebee; padding: 15px; border-radius: 8px;">
-        <h5>❌ Negativas Mais Frequentes</h5>
-        <div style="display: flex; flex-wrap: wrap; gap: 5px;">
-            <span style="background: #dc3545; color: white; padding: 3px 8px; border-radius: 15px; font-size: 0.8em;">problema</span>
-            <span style="background: #dc3545; color: white; padding: 3px 8px; border-radius: 15px; font-size: 0.8em;">dificuldade</span>
-            <span style="background: #dc3545; color: white; padding: 3px 8px; border-radius: 15px; font-size: 0.8em;">confuso</span>
-            <span style="background: #dc3545; color: white; padding: 3px 8px; border-radius: 15px; font-size: 0.8em;">melhorar</span>
-            <span style="background: #dc3545; color: white; padding: 3px 8px; border-radius: 15px; font-size: 0.8em;">insatisfeito</span>
-        </div>
-    </div>
-</div>
-
-<h3 id="insights-estrategicos-sentimento">💡 Insights Estratégicos</h3>
-<div style="background: #e3f2fd; padding: 15px; border-radius: 8px; margin: 15px 0;">
-    <h4>Recomendações Baseadas no Sentimento</h4>
-    <ol>
-        <li><strong>Amplificar Positivos:</strong> Usar depoimentos e casos de sucesso (68% positivo)</li>
-        <li><strong>Converter Neutros:</strong> Fornecer mais informações e provas sociais (22% neutro)</li>
-        <li><strong>Resolver Negativos:</strong> Abordar objeções específicas identificadas (10% negativo)</li>
-        <li><strong>Manter Tom Entusiástico:</strong> Linguagem que ressoa com a emoção dominante</li>
-        <li><strong>Criar Urgência Positiva:</strong> Aproveitar a ansiedade construtiva (5%)</li>
-    </ol>
-</div>
-"""
+        return _SENTIMENT_MODULE_HTML
     
     def _generate_viral_module_html(self, session_dir: Path) -> str:
         """Gera HTML do módulo Análise Viral"""
         
-        return """
-<hr />
-<h2 id="analise-viral-fatores-sucesso">🔥 ANÁLISE DE CONTEÚDO VIRAL E FATORES DE SUCESSO</h2>
-<p><strong>Metodologia:</strong> Análise de padrões virais baseada em métricas de engajamento e propagação</p>
-
-<div style="display: grid; grid-template-columns: repeat(2, 1fr); gap: 20px; margin: 20px 0;">
-    <div style="background: #fff3cd; padding: 15px; border-radius: 8px;">
-        <h4>⚡ Fatores de Viralização</h4>
-        <ul>
-            <li><strong>Timing Perfeito:</strong> Publicação em horários de pico</li>
-            <li><strong>Emoção Intensa:</strong> Conteúdo que gera reação forte</li>
-            <li><strong>Facilidade de Compartilhamento:</strong> Formato otimizado</li>
-            <li><strong>Relevância Cultural:</strong> Conexão com tendências atuais</li>
-            <li><strong>Valor Percebido:</strong> Utilidade ou entretenimento claro</li>
-        </ul>
-    </div>
-    <div style="background: #e8f4fd; padding: 15px; border-radius: 8px;">
-        <h4>📊 Métricas de Viralização</h4>
-        <ul>
-            <li><strong>Taxa de Compartilhamento:</strong> > 15% (vs. 2% padrão)</li>
-            <li><strong>Velocidade de Propagação:</strong> 1000+ interações/hora</li>
-            <li><strong>Alcance Orgânico:</strong> 10x maior que posts normais</li>
-            <li><strong>Tempo de Vida:</strong> 72h+ de engajamento ativo</li>
-            <li><strong>Cross-Platform:</strong> Propagação em múltiplas redes</li>
-        </ul>
-    </div>
-</div>
-
-<h3 id="anatomia-post-viral">🧬 Anatomia de um Post Viral</h3>
-<div style="background: #f8f9fa; padding: 20px; border-radius: 8px; margin: 15px 0;">
-    <div style="display: grid; grid-template-columns: repeat(3, 1fr); gap: 15px;">
-        <div style="background: #d4edda; padding: 15px; border-radius: 8px; text-align: center;">
-            <h5>🎯 Hook Inicial</h5>
-            <p><strong>Primeiros 3 segundos</strong></p>
-            <ul style="text-align: left; font-size: 0.9em;">
-                <li>Pergunta provocativa</li>
-                <li>Estatística chocante</li>
-                <li>Visual impactante</li>
-                <li>Contradição aparente</li>
-            </ul>
-        </div>
-        <div style="background: #cce5ff; padding: 15px; border-radius: 8px; text-align: center;">
-            <h5>💎 Conteúdo Central</h5>
-            <p><strong>Desenvolvimento</strong></p>
-            <ul style="text-align: left; font-size: 0.9em;">
-                <li>História envolvente</li>
-                <li>Informação valiosa</li>
-                <li>Prova social forte</li>
-                <li>Transformação clara</li>
-            </ul>
-        </div>
-        <div style="background: #f0e6ff; padding: 15px; border-radius: 8px; text-align: center;">
-            <h5>🚀 Call-to-Action</h5>
-            <p><strong>Finalização</strong></p>
-            <ul style="text-align: left; font-size: 0.9em;">
-                <li>Convite ao engajamento</li>
-                <li>Pergunta para comentários</li>
-                <li>Incentivo ao compartilhamento</li>
-                <li>Próximo passo claro</li>
-            </ul>
-        </div>
-    </div>
-</div>
-
-<h3 id="padroes-virais-identificados">🔍 Padrões Virais Identificados</h3>
-<div style="background: #e7f3ff; padding: 15px; border-radius: 8px; margin: 15px 0;">
-    <h4>Top 5 Formatos Virais</h4>
-    <ol>
-        <li><strong>Antes vs. Depois:</strong> Transformações visuais dramáticas</li>
-        <li><strong>Listas Numeradas:</strong> "5 segredos que mudaram minha vida"</li>
-        <li><strong>Histórias Pessoais:</strong> Vulnerabilidade autêntica</li>
-        <li><strong>Dicas Contraintuitivas:</strong> "Pare de fazer isso..."</li>
-        <li><strong>Tendências Adaptadas:</strong> Formato viral + conteúdo próprio</li>
-    </ol>
-</div>
-
-<h3 id="calendario-viral">📅 Calendário de Oportunidades Virais</h3>
-<div style="background: #fff0f5; padding: 15px; border-radius: 8px; margin: 15px 0;">
-    <h4>Momentos de Alta Viralização</h4>
-    <ul>
-        <li><strong>Segunda-feira (8h-10h):</strong> Motivação para a semana</li>
-        <li><strong>Quarta-feira (12h-14h):</strong> Conteúdo educativo</li>
-        <li><strong>Sexta-feira (17h-19h):</strong> Entretenimento e inspiração</li>
-        <li><strong>Domingo (19h-21h):</strong> Reflexões e planejamento</li>
-        <li><strong>Eventos Especiais:</strong> Datas comemorativas e trending topics</li>
-    </ul>
-</div>
-
-<h3 id="estrategia-replicacao">🎯 Estratégia de Replicação</h3>
-<div style="background: #f0f8ff; padding: 15px; border-radius: 8px; margin: 15px 0;">
-    <h4>Como Replicar o Sucesso Viral</h4>
-    <ol>
-        <li><strong>Identificar Padrões:</strong> Analisar posts virais do nicho</li>
-        <li><strong>Adaptar Formato:</strong> Usar estrutura comprovada com conteúdo próprio</li>
-        <li><strong>Testar Timing:</strong> Publicar nos horários de maior engajamento</li>
-        <li><strong>Otimizar Visual:</strong> Usar elementos visuais impactantes</li>
-        <li><strong>Monitorar e Amplificar:</strong> Impulsionar posts com tração inicial</li>
-    </ol>
-</div>
-"""
+        return _VIRAL_MODULE_HTML
     
     def _generate_generic_module_html(self, module: str) -> str:
         """Gera HTML genérico para módulos não específicos"""
         
-        module_title = module.replace('_', ' ').title()
-        
-        return f"""
-<hr />
-<h2 id="{module.lower()}">{module_title}</h2>
-<div style="background: #f8d7da; color: #721c24; padding: 15px; border-radius: 8px; margin: 20px 0;">
-    <h4>⚠️ Módulo em Desenvolvimento</h4>
-    <p>O módulo <strong>{module_title}</strong> foi identificado como necessário mas ainda não foi implementado completamente.</p>
-    <p><strong>Status:</strong> Aguardando dados específicos da análise</p>
-    <p><em>Este módulo será populado automaticamente quando os dados estiverem disponíveis.</em></p>
-</div>
-"""
+        return _render_generic_module_html(module)
     
     def _improve_html_formatting(self, html_content: str) -> str:
         """Melhora a formatação geral do HTML"""
         
-        # Adiciona estilos CSS inline para melhor apresentação
-        css_improvements = """
-<style>
-    body { font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif; line-height: 1.6; color: #333; }
-    h1, h2, h3, h4, h5 { color: #2c3e50; margin-top: 1.5em; }
-    h1 { border-bottom: 3px solid #3498db; padding-bottom: 10px; }
-    h2 { border-bottom: 2px solid #e74c3c; padding-bottom: 8px; }
-    h3 { border-left: 4px solid #f39c12; padding-left: 15px; }
-    .highlight { background: linear-gradient(120deg, #a8e6cf 0%, #dcedc1 100%); padding: 2px 6px; border-radius: 3px; }
-    .metric { font-size: 1.2em; font-weight: bold; color: #27ae60; }
-    .warning { background: #fff3cd; border: 1px solid #ffeaa7; padding: 10px; border-radius: 5px; }
-    .success { background: #d4edda; border: 1px solid #c3e6cb; padding: 10px; border-radius: 5px; }
-    .info { background: #d1ecf1; border: 1px solid #bee5eb; padding: 10px; border-radius: 5px; }
-    table { border-collapse: collapse; width: 100%; margin: 15px 0; }
-    th, td { border: 1px solid #ddd; padding: 12px; text-align: left; }
-    th { background-color: #f8f9fa; font-weight: bold; }
-    .grid-2 { display: grid; grid-template-columns: 1fr 1fr; gap: 20px; }
-    .grid-3 { display: grid; grid-template-columns: 1fr 1fr 1fr; gap: 20px; }
-    @media (max-width: 768px) { .grid-2, .grid-3 { grid-template-columns: 1fr; } }
-</style>
-"""
         
         # Insere CSS no início do HTML
         if '<h1' in html_content:
-            html_content = css_improvements + '\n' + html_content
-        
-        # Melhora formatação de listas
-        html_content = re.sub(r'<li><strong>(.*?):</strong>(.*?)</li>', 
-                             r'<li><span class="highlight"><strong>\1:</strong></span>\2</li>', 
-                             html_content)
+            html_content = _CSS_IMPROVEMENTS + html_content
         
-        # Destaca métricas numéricas
-        html_content = re.sub(r'(\d+%|\d+\+|\d+x|R\$ [\d,]+)', 
-                             r'<span class="metric">\1</span>', 
-                             html_content)
+        # Melhora formatação de listas e destaca métricas numéricas
+        html_content = _HIGHLIGHT_RE.sub(_highlight_replacement, html_content)
         
         return html_content
     
-    def _generate_detailed_md(self, html_content: str, raw_data: Dict[str, List[str]], session_dir: Path) -> str:
-        """Gera arquivo MD detalhado com dados brutos preservados"""
+    def _generate_detailed_md(self, html_content: str, raw_data: Dict[str, List[str]], session_dir: Path,
+                              out_path: Optional[Path] = None, summary: Optional[str] = None,
+                              file_count: Optional[int] = None) -> str:
+        """
+        Gera arquivo MD detalhado com dados brutos preservados
         
-        md_content = f"""# RELATÓRIO DETALHADO - DADOS COMPLETOS
+        Args:
+            html_content: HTML sanitizado
+            raw_data: Dados brutos extraídos do HTML original
+            session_dir: Diretório da sessão
+            out_path: Se informado, os pedaços do MD são gravados direto nesse arquivo
+                (sem montar o MD inteiro em memória) e o caminho gravado é retornado
+                (<out_path>.gz acima de md_gzip_threshold)
+            summary: Sumário executivo já extraído; calculado aqui quando não informado
+            file_count: Arquivos da sessão já contados; contados aqui quando não informado
+            
+        Returns:
+            Conteúdo MD, ou o caminho gravado quando out_path é informado
+        """
+        if summary is None:
+            summary = self._extract_summary_from_html(html_content)
+        
+        if file_count is None:
+            file_count = _count_session_files(session_dir)
+        
+        chunks = self._iter_detailed_md_chunks(html_content, raw_data, session_dir, summary, file_count)
+        
+        if out_path is None:
+            return ''.join(chunks)
+        
+        tmp = _tmp_path(out_path)
+        with io.open(tmp, 'w', encoding='utf-8', buffering=1 << 20) as f:
+            for chunk in chunks:
+                f.write(chunk)
+        
+        # Mesma regra de _write_detailed_md, decidida pelo tamanho já gravado
+        gz_path = out_path.with_name(out_path.name + '.gz')
+        if 0 < self.md_gzip_threshold < tmp.stat().st_size:
+            gz_tmp = _tmp_path(gz_path)
+            with open(tmp, 'rb') as src, gzip.open(gz_tmp, 'wb', compresslevel=1) as dst:
+                shutil.copyfileobj(src, dst, 1 << 20)
+            os.replace(gz_tmp, gz_path)
+            os.remove(tmp)
+            _remove_if_exists(out_path)
+            return str(gz_path)
+        
+        os.replace(tmp, out_path)
+        _remove_if_exists(gz_path)
+        return str(out_path)
+    
+    def _iter_detailed_md_chunks(self, html_content: str, raw_data: Dict[str, List[str]], session_dir: Path,
+                                   summary: str, file_count: int):
+        """Gera o MD detalhado em pedaços: cabeçalho, corpo e metadados"""
+        yield self._md_header(session_dir)
+        yield from self._iter_md_body_chunks(html_content, raw_data, summary)
+        yield self._md_metadata(session_dir, file_count, sum(len(v) for v in raw_data.values()))
+    
+    def _md_header(self, session_dir: Path) -> str:
+        """Cabeçalho do MD detalhado (data de geração e sessão)"""
+        return f"""# RELATÓRIO DETALHADO - DADOS COMPLETOS
 **Gerado em:** {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}
 **Sessão:** {session_dir.name}
-
+"""
+    
+    def _iter_md_body_chunks(self, html_content: str, raw_data: Dict[str, List[str]], summary: str):
+        """Corpo do MD detalhado (sumário, dados brutos e análise completa), guardado no cache"""
+        yield """
 ---
 
 ## 📋 SUMÁRIO EXECUTIVO
 
-{self._extract_summary_from_html(html_content)}
+"""
+        yield summary
+        
+        yield """
 
 ---
 
@@ -772,64 +817,78 @@ class HTMLReportSanitizer:
 
 ### 📊 Blocos JSON Extraídos
 ```json
-{json.dumps(raw_data.get('json_blocks', []), indent=2, ensure_ascii=False)}
+"""
+        yield _dumps_indented(raw_data.get('json_blocks', []))
+        
+        yield """
 ```
 
 ### 💻 Código Extraído
 ```python
-{''.join(raw_data.get('code_blocks', []))}
+"""
+        yield from raw_data.get('code_blocks', [])
+        
+        yield """
 ```
 
 ### 🐛 Logs de Debug
 ```
-{''.join(raw_data.get('debug_logs', []))}
+"""
+        yield from raw_data.get('debug_logs', [])
+        
+        yield """
 ```
 
 ### 🔗 Chamadas de API
 ```
-{''.join(raw_data.get('api_calls', []))}
+"""
+        yield from raw_data.get('api_calls', [])
+        
+        yield """
 ```
 
 ### ⚙️ Dados Técnicos
 ```
-{''.join(raw_data.get('technical_data', []))}
+"""
+        yield from raw_data.get('technical_data', [])
+        
+        yield """
 ```
 
 ---
 
 ## 📈 ANÁLISE COMPLETA
 
-{self._convert_html_to_md(html_content)}
+"""
+        yield self._convert_html_to_md(html_content)
+    
+    def _md_metadata(self, session_dir: Path, file_count: int, raw_count: int) -> str:
+        """Bloco final de metadados do MD detalhado (arquivos e timestamp atuais)"""
+        return f"""
 
 ---
 
 ## 🔍 METADADOS DA SESSÃO
 
 - **Diretório:** {session_dir}
-- **Arquivos Processados:** {len(list(session_dir.glob('*')))}
+- **Arquivos Processados:** {file_count}
 - **Timestamp de Sanitização:** {datetime.now().isoformat()}
-- **Dados Brutos Preservados:** {sum(len(v) for v in raw_data.values())} itens
+- **Dados Brutos Preservados:** {raw_count} itens
 
 ---
 
 *Este arquivo contém todos os dados técnicos e brutos removidos do relatório HTML final para melhor apresentação.*
 """
-        
-        return md_content
     
     def _extract_summary_from_html(self, html_content: str) -> str:
         """Extrai sumário executivo do HTML"""
         
         # Procura por seção de sumário
-        summary_match = re.search(r'<h2[^>]*>SUMÁRIO EXECUTIVO</h2>(.*?)(?=<h2|$)', html_content, re.DOTALL | re.IGNORECASE)
+        summary_html = _find_summary_html(html_content)
         
-        if summary_match:
-            summary_html = summary_match.group(1)
+        if summary_html is not None:
             # Converte HTML básico para MD
-            summary_md = re.sub(r'<p>(.*?)</p>', r'\1\n', summary_html)
-            summary_md = re.sub(r'<strong>(.*?)</strong>', r'**\1**', summary_md)
-            summary_md = re.sub(r'<em>(.*?)</em>', r'*\1*', summary_md)
-            summary_md = re.sub(r'<[^>]+>', '', summary_md)  # Remove outras tags HTML
+            summary_md = _SUMMARY_TAG_RE.sub(_summary_tag_replacement, summary_html)
             return summary_md.strip()
         
         return "Sumário executivo não encontrado no relatório HTML."
@@ -837,31 +896,21 @@ class HTMLReportSanitizer:
     def _convert_html_to_md(self, html_content: str) -> str:
         """Converte HTML básico para Markdown"""
         
-        md_content = html_content
-        
-        # Converte headers
-        md_content = re.sub(r'<h1[^>]*>(.*?)</h1>', r'# \1', md_content)
-        md_content = re.sub(r'<h2[^>]*>(.*?)</h2>', r'## \1', md_content)
-        md_content = re.sub(r'<h3[^>]*>(.*?)</h3>', r'### \1', md_content)
-        md_content = re.sub(r'<h4[^>]*>(.*?)</h4>', r'#### \1', md_content)
-        
-        # Converte formatação
-        md_content = re.sub(r'<strong>(.*?)</strong>', r'**\1**', md_content)
-        md_content = re.sub(r'<em>(.*?)</em>', r'*\1*', md_content)
-        md_content = re.sub(r'<p>(.*?)</p>', r'\1\n', md_content)
-        
-        # Converte listas
-        md_content = re.sub(r'<ul[^>]*>', '', md_content)
-        md_content = re.sub(r'</ul>', '', md_content)
-        md_content = re.sub(r'<ol[^>]*>', '', md_content)
-        md_content = re.sub(r'</ol>', '', md_content)
-        md_content = re.sub(r'<li[^>]*>(.*?)</li>', r'- \1', md_content)
+        # Converte headers, formatação, parágrafos e listas em uma única varredura
+        parts = []
+        pos = 0
+        for match in _MD_TAG_RE.finditer(html_content):
+            parts.append(html_content[pos:match.start()])
+            parts.append(_MD_TAG_DISPATCH[(match.group(2), bool(match.group(1)))])
+            pos = match.end()
+        parts.append(html_content[pos:])
+        md_content = ''.join(parts)
         
         # Remove outras tags HTML
-        md_content = re.sub(r'<[^>]+>', '', md_content)
+        md_content = _strip_tags(md_content)
         
         # Limpa espaços excessivos
-        md_content = re.sub(r'\n\s*\n\s*\n', '\n\n', md_content)
+        md_content = _BLANK_LINES_RE.sub('\n\n', md_content)
         
         return md_content.strip()
     
@@ -887,23 +936,52 @@ Os dados brutos não puderam ser extraídos adequadamente.
 *Este é um arquivo de fallback gerado automaticamente.*
 """
 
-    def save_sanitized_reports(self, sanitized_html: str, detailed_md: str, session_dir: Path) -> Tuple[Path, Path]:
-        """Salva os relatórios sanitizados"""
+    def save_sanitized_reports(self, sanitized_html: str, detailed_md: Optional[str],
+                               session_dir: Path) -> Tuple[Path, Optional[Path]]:
+        """Salva os relatórios sanitizados (o MD é omitido quando detailed_md é None)"""
         
         try:
-            # Salva HTML sanitizado
             html_path = session_dir / "relatorio_final_sanitizado.html"
-            with open(html_path, 'w', encoding='utf-8') as f:
-                f.write(sanitized_html)
             
-            # Salva MD detalhado
+            if detailed_md is None:
+                # Salva só o HTML sanitizado
+                _write_text_atomic(html_path, sanitized_html)
+                logger.info(f"✅ Relatório salvo: {html_path.name}")
+                return html_path, None
+            
+            # Salva HTML sanitizado e MD detalhado em paralelo
             md_path = session_dir / "relatorio_completo_detalhado.md"
-            with open(md_path, 'w', encoding='utf-8') as f:
-                f.write(detailed_md)
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                html_future = executor.submit(_write_text_atomic, html_path, sanitized_html)
+                md_future = executor.submit(self._write_detailed_md, md_path, detailed_md)
+                html_future.result()
+                md_path = md_future.result()
             
             logger.info(f"✅ Relatórios salvos: {html_path.name} e {md_path.name}")
             return html_path, md_path
             
         except Exception as e:
             logger.error(f"❌ Erro salvando relatórios: {e}")
-            return None, None
\ No newline at end of file
+            return None, None
+    
+    def _write_detailed_md(self, md_path: Path, detailed_md: str) -> Path:
+        """
+        Grava o MD detalhado, como <md_path>.gz acima de md_gzip_threshold, removendo a outra variante
+        
+        Returns:
+            Caminho efetivamente gravado
+        """
+        gz_path = md_path.with_name(md_path.name + '.gz')
+        if self.md_gzip_threshold > 0:
+            data = detailed_md.encode('utf-8')
+            if len(data) > self.md_gzip_threshold:
+                tmp = _tmp_path(gz_path)
+                with gzip.open(tmp, 'wb', compresslevel=1) as f:
+                    f.write(data)
+                os.replace(tmp, gz_path)
+                _remove_if_exists(md_path)
+                return gz_path
+        
+        _write_text_atomic(md_path, detailed_md)
+        _remove_if_exists(gz_path)
+        return md_path
\ No newline at end of file
@@ -6,16 +6,108 @@ Integra posts virais baixados no relatório final HTML
 Máximo 8 posts, 4 por página, com descrições detalhadas das imagens
 """
 
+import io
 import os
 import json
+import heapq
 import logging
+from collections import defaultdict
+from operator import itemgetter
 from typing import List, Dict, Any, Optional
 from datetime import datetime
+from html import escape as html_escape
 from pathlib import Path
 import re
 
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+try:
+    import ijson
+    HAS_IJSON = True
+except ImportError:
+    HAS_IJSON = False
+
 logger = logging.getLogger(__name__)
 
+# Dict vazio compartilhado para campos aninhados ausentes (somente leitura)
+_EMPTY: Dict[str, Any] = {}
+
+# Termos no nome dos arquivos JSON da sessão com dados virais, em ordem de leitura
+_VIRAL_FILE_TERMS = ('viral', 'posts', 'social')
+
+# Fragmentos HTML estáticos da seção de conteúdo viral
+_SECTION_HEADER_TEMPLATE = """
+<hr />
+<h2 id="conteúdo-viral-analisado">🔥 CONTEÚDO VIRAL ANALISADO</h2>
+<p><strong>Posts Selecionados:</strong> {total_posts} | <strong>Critério:</strong> Alto engajamento e relevância</p>
+<p><em>Análise baseada em métricas reais de engajamento, qualidade visual e relevância temática.</em></p>
+"""
+
+_NO_IMAGES_HTML = """
+<div style="margin: 15px 0;">
+    <p><strong>🖼️ Conteúdo Visual:</strong> <em>Imagens não disponíveis localmente</em></p>
+</div>
+"""
+
+_FALLBACK_HTML = """
+<hr />
+<h2 id="conteúdo-viral-analisado">🔥 CONTEÚDO VIRAL ANALISADO</h2>
+<div style="background: #f8d7da; color: #721c24; padding: 15px; border-radius: 8px; margin: 20px 0;">
+    <h4>⚠️ Posts Virais Não Disponíveis</h4>
+    <p>Nenhum post viral foi encontrado ou baixado durante esta análise.</p>
+    <p><strong>Possíveis causas:</strong></p>
+    <ul>
+        <li>APIs de busca temporariamente indisponíveis</li>
+        <li>Critérios de relevância muito restritivos</li>
+        <li>Problemas de conectividade durante a coleta</li>
+    </ul>
+    <p><em>Recomendação: Execute uma nova análise com termos de busca mais amplos.</em></p>
+</div>
+"""
+
+# Palavras-chave virais que somam 0.05 cada ao score do post
+_VIRAL_KEYWORDS = ('viral', 'trending', 'popular', 'amazing', 'incredible', 'must-see')
+
+# Plataformas consideradas fonte confiável no score do post
+_TRUSTED_PLATFORMS = frozenset({'instagram', 'facebook', 'twitter', 'linkedin'})
+
+# Arquivos JSON de lista a partir deste tamanho são lidos em streaming com ijson
+_STREAM_MIN_BYTES = 8 * 1024 * 1024
+
+# Domínio de uma URL de imagem (descrição das imagens)
+_DOMAIN_RE = re.compile(r'https?://([^/]+)')
+
+
+def _load_json_file(file_path: Path) -> Any:
+    """Lê um arquivo JSON com orjson quando disponível, caindo no json da stdlib se ele rejeitar"""
+    with open(file_path, 'rb') as f:
+        raw = f.read()
+    
+    if HAS_ORJSON:
+        try:
+            return orjson.loads(raw)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(raw.decode('utf-8'))
+
+
+def _stream_json_list(file_path: Path) -> Optional[List[Any]]:
+    """Itens de uma lista JSON lidos em streaming com ijson (None se não for lista ou falhar)"""
+    with open(file_path, 'rb') as f:
+        head = f.read(64).lstrip()
+        if not head.startswith(b'['):
+            return None
+        f.seek(0)
+        try:
+            return list(ijson.items(f, 'item', use_float=True))
+        except ijson.JSONError:
+            return None
+
+
 class ViralPostsReportIntegration:
     """Integrador de posts virais no relatório final"""
     
@@ -24,6 +116,16 @@ class ViralPostsReportIntegration:
         self.posts_per_page = 4
         self.supported_formats = ['.jpg', '.jpeg', '.png', '.webp', '.gif']
         
+        # Arquivos JSON de dados virais maiores que isto são ignorados
+        self.max_viral_file_bytes = int(os.getenv('VIRAL_JSON_MAX_BYTES', str(50 * 1024 * 1024)))
+        
+        # Cache caminho -> existe, válido durante uma integração (evita stat repetido)
+        self._exists_cache: Dict[str, bool] = {}
+        
+        # Cache id(post) -> (post, campos planos), válido durante uma integração; o
+        # próprio post fica guardado para que seu id não seja reutilizado
+        self._fields_cache: Dict[int, tuple] = {}
+        
         logger.info("📊 Viral Posts Report Integration inicializado")
     
     def integrate_viral_posts_to_report(self, session_dir: Path, viral_data: List[Dict[str, Any]]) -> str:
@@ -37,7 +139,14 @@ class ViralPostsReportIntegration:
         Returns:
             HTML formatado com posts virais
         """
+        # Sem dados não há o que selecionar nem montar
+        if not viral_data:
+            return self._generate_fallback_html()
+        
         try:
+            # Resolve a existência das imagens com um scandir por diretório
+            self._prefetch_exists(viral_data)
+            
             # Seleciona os melhores posts
             selected_posts = self._select_best_posts(viral_data)
             
@@ -50,6 +159,46 @@ class ViralPostsReportIntegration:
         except Exception as e:
             logger.error(f"❌ Erro integrando posts virais: {e}")
             return self._generate_fallback_html()
+        
+        finally:
+            self._exists_cache.clear()
+            self._fields_cache.clear()
+    
+    def _exists(self, path: str) -> bool:
+        """os.path.exists memoizado em _exists_cache (um stat por caminho por integração)"""
+        exists = self._exists_cache.get(path)
+        if exists is None:
+            exists = os.path.exists(path)
+            self._exists_cache[path] = exists
+        return exists
+    
+    def _prefetch_exists(self, posts: List[Dict[str, Any]]) -> None:
+        """Preenche _exists_cache com os caminhos encontrados listando cada diretório de imagens uma vez"""
+        paths_by_dir = defaultdict(list)
+        for post in posts or []:
+            candidates = [img.get('local_path') for img in post.get('images') or []]
+            for screenshot in post.get('screenshots') or []:
+                candidates.append(screenshot.get('path') if isinstance(screenshot, dict) else screenshot)
+            candidates.extend((post.get('visual_content') or _EMPTY).get('screenshots') or [])
+            
+            for path in candidates:
+                if isinstance(path, str) and path not in self._exists_cache:
+                    paths_by_dir[os.path.dirname(path)].append(path)
+        
+        for directory, paths in paths_by_dir.items():
+            if len(paths) < 2:
+                continue
+            try:
+                with os.scandir(directory or '.') as entries:
+                    files = {entry.name for entry in entries if not entry.is_symlink()}
+            except OSError:
+                continue
+            
+            for path in paths:
+                name = os.path.basename(path)
+                # Ausências (caixa, normalização Unicode) ficam para o os.path.exists de _exists
+                if name not in ('', '.', '..') and name in files:
+                    self._exists_cache[path] = True
     
     def _select_best_posts(self, viral_data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """Seleciona os melhores posts virais baseado em métricas"""
@@ -63,14 +212,14 @@ class ViralPostsReportIntegration:
             if self._has_valid_images(post):
                 posts_with_images.append(post)
         
-        # Calcula score de relevância para cada post
+        # Calcula score de relevância para cada post (mesmo "agora" para todos)
+        now = datetime.now()
         for post in posts_with_images:
-            score = self._calculate_post_score(post)
+            score = self._calculate_post_score(post, now)
             post['relevance_score'] = score
         
-        # Ordena por score e pega os melhores
-        sorted_posts = sorted(posts_with_images, key=lambda x: x.get('relevance_score', 0), reverse=True)
-        selected = sorted_posts[:self.max_posts]
+        # Pega os melhores por score (mesma ordem de sorted(..., reverse=True)[:max_posts])
+        selected = heapq.nlargest(self.max_posts, posts_with_images, key=itemgetter('relevance_score'))
         
         logger.info(f"🎯 Selecionados {len(selected)} posts de {len(viral_data)} disponíveis")
         return selected
@@ -82,38 +231,55 @@ class ViralPostsReportIntegration:
         images = post.get('images', [])
         if images:
             for img in images:
-                if img.get('local_path') and Path(img['local_path']).exists():
+                if img.get('local_path') and self._exists(img['local_path']):
                     return True
         
         # Verifica screenshots
         screenshots = post.get('screenshots', [])
         if screenshots:
             for screenshot in screenshots:
-                if isinstance(screenshot, str) and Path(screenshot).exists():
+                if isinstance(screenshot, str) and self._exists(screenshot):
                     return True
                 elif isinstance(screenshot, dict) and screenshot.get('path'):
-                    if Path(screenshot['path']).exists():
+                    if self._exists(screenshot['path']):
                         return True
         
         # Verifica visual_content
-        visual_content = post.get('visual_content', {})
+        visual_content = post.get('visual_content') or _EMPTY
         if visual_content.get('screenshots'):
             for screenshot in visual_content['screenshots']:
-                if Path(screenshot).exists():
+                if self._exists(screenshot):
                     return True
         
         return False
     
-    def _calculate_post_score(self, post: Dict[str, Any]) -> float:
-        """Calcula score de relevância do post"""
+    def _post_fields(self, post: Dict[str, Any]) -> tuple:
+        """(likes, comments, shares, platform, text) do post, memoizados em _fields_cache"""
+        cached = self._fields_cache.get(id(post))
+        if cached is not None and cached[0] is post:
+            return cached[1]
+        
+        engagement = post.get('engagement') or _EMPTY
+        fields = (
+            engagement.get('likes', 0),
+            engagement.get('comments', 0),
+            engagement.get('shares', 0),
+            (post.get('source') or _EMPTY).get('platform'),
+            (post.get('content') or _EMPTY).get('text', '') or post.get('text', ''),
+        )
+        self._fields_cache[id(post)] = (post, fields)
+        return fields
+    
+    def _calculate_post_score(self, post: Dict[str, Any], now: Optional[datetime] = None) -> float:
+        """Calcula score de relevância do post (now: referência para a idade do post)"""
+        
+        if now is None:
+            now = datetime.now()
         
         score = 0.0
         
         # Score por engajamento
-        engagement = post.get('engagement', {})
-        likes = engagement.get('likes', 0)
-        comments = engagement.get('comments', 0)
-        shares = engagement.get('shares', 0)
+        likes, comments, shares, platform, text = self._post_fields(post)
         
         # Normaliza métricas (assumindo valores típicos)
         if likes > 0:
@@ -124,20 +290,17 @@ class ViralPostsReportIntegration:
             score += min(shares / 500, 0.2)  # Máximo 0.2 por shares
         
         # Score por qualidade do conteúdo
-        content = post.get('content', {})
-        text = content.get('text', '') or post.get('text', '')
-        
         if text:
             # Bonus por tamanho do texto (conteúdo substancial)
             if len(text) > 100:
                 score += 0.1
             
-            # Bonus por palavras-chave virais
-            viral_keywords = ['viral', 'trending', 'popular', 'amazing', 'incredible', 'must-see']
-            text_lower = text.lower()
-            for keyword in viral_keywords:
-                if keyword in text_lower:
-                    score += 0.05
+            # Bonus por palavras-chave virais (nenhuma cabe em menos de 5 caracteres)
+            if len(text) >= 5:
+                text_lower = text.lower()
+                for keyword in _VIRAL_KEYWORDS:
+                    if keyword in text_lower:
+                        score += 0.05
         
         # Score por qualidade das imagens
         images = post.get('images', [])
@@ -145,17 +308,17 @@ class ViralPostsReportIntegration:
             score += min(len(images) * 0.1, 0.2)  # Bonus por múltiplas imagens
         
         # Score por fonte confiável
-        source = post.get('source', {})
-        platform = source.get('platform', '').lower()
-        if platform in ['instagram', 'facebook', 'twitter', 'linkedin']:
+        platform = (platform or '').lower()
+        if platform in _TRUSTED_PLATFORMS:
             score += 0.1
         
         # Score por data recente
         timestamp = post.get('timestamp') or post.get('created_at')
         if timestamp:
             try:
-                post_date = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
-                days_old = (datetime.now() - post_date.replace(tzinfo=None)).days
+                # Python 3.11+ aceita o sufixo 'Z' direto no fromisoformat
+                post_date = datetime.fromisoformat(timestamp)
+                days_old = (now - post_date.replace(tzinfo=None)).days
                 if days_old <= 7:
                     score += 0.15  # Bonus por conteúdo recente
                 elif days_old <= 30:
@@ -171,49 +334,44 @@ class ViralPostsReportIntegration:
         if not posts:
             return self._generate_fallback_html()
         
-        html_parts = []
+        # Partes gravadas direto no buffer, separadas por '\n'
+        buf = io.StringIO()
         
         # Cabeçalho da seção
-        html_parts.append("""
-<hr />
-<h2 id="conteúdo-viral-analisado">🔥 CONTEÚDO VIRAL ANALISADO</h2>
-<p><strong>Posts Selecionados:</strong> {total_posts} | <strong>Critério:</strong> Alto engajamento e relevância</p>
-<p><em>Análise baseada em métricas reais de engajamento, qualidade visual e relevância temática.</em></p>
-""".format(total_posts=len(posts)))
+        buf.write(_SECTION_HEADER_TEMPLATE.format(total_posts=len(posts)))
+        
+        # Base dos caminhos relativos das imagens, calculada uma vez
+        base_dir = str(session_dir.parent)
         
         # Divide posts em páginas (4 por página)
         pages = [posts[i:i + self.posts_per_page] for i in range(0, len(posts), self.posts_per_page)]
         
         for page_num, page_posts in enumerate(pages, 1):
-            html_parts.append(f"""
+            buf.write('\n')
+            buf.write(f"""
 <h3 id="página-{page_num}-posts-virais">📄 Página {page_num} - Posts Virais</h3>
 """)
             
             for post_num, post in enumerate(page_posts, 1):
-                post_html = self._generate_single_post_html(post, session_dir, page_num, post_num)
-                html_parts.append(post_html)
+                buf.write('\n')
+                buf.write(self._generate_single_post_html(post, base_dir, page_num, post_num))
         
         # Resumo estatístico
-        stats_html = self._generate_viral_stats_html(posts)
-        html_parts.append(stats_html)
+        buf.write('\n')
+        buf.write(self._generate_viral_stats_html(posts))
         
-        return '\n'.join(html_parts)
+        return buf.getvalue()
     
-    def _generate_single_post_html(self, post: Dict[str, Any], session_dir: Path, page_num: int, post_num: int) -> str:
-        """Gera HTML de um post individual"""
+    def _generate_single_post_html(self, post: Dict[str, Any], base_dir: str, page_num: int, post_num: int) -> str:
+        """Gera HTML de um post individual (base_dir: pai do diretório da sessão)"""
         
         # Extrai dados do post
-        content = post.get('content', {})
-        text = content.get('text', '') or post.get('text', '') or post.get('description', '')
-        
-        engagement = post.get('engagement', {})
-        likes = engagement.get('likes', 0)
-        comments = engagement.get('comments', 0)
-        shares = engagement.get('shares', 0)
+        likes, comments, shares, platform, text = self._post_fields(post)
+        text = text or post.get('description', '')
         
-        source = post.get('source', {})
-        platform = source.get('platform', 'Desconhecido')
-        url = source.get('url', '') or post.get('url', '')
+        if platform is None:
+            platform = 'Desconhecido'
+        url = (post.get('source') or _EMPTY).get('url', '') or post.get('url', '')
         
         score = post.get('relevance_score', 0.0)
         
@@ -221,8 +379,14 @@ class ViralPostsReportIntegration:
         if len(text) > 300:
             text = text[:297] + "..."
         
+        # Escapa os campos vindos dos dados coletados (texto truncado, para não
+        # cortar entidades ao meio)
+        text = html_escape(text)
+        platform = html_escape(str(platform))
+        url = html_escape(str(url))
+        
         # Gera HTML das imagens
-        images_html = self._generate_post_images_html(post, session_dir)
+        images_html = self._generate_post_images_html(post, base_dir)
         
         # HTML do post
         post_html = f"""
@@ -255,10 +419,10 @@ class ViralPostsReportIntegration:
         
         return post_html
     
-    def _generate_post_images_html(self, post: Dict[str, Any], session_dir: Path) -> str:
-        """Gera HTML das imagens do post"""
+    def _generate_post_images_html(self, post: Dict[str, Any], base_dir: str) -> str:
+        """Gera HTML das imagens do post, com caminhos relativos a base_dir"""
         
-        images_html_parts = []
+        images_buf = io.StringIO()
         image_count = 0
         
         # Processa imagens baixadas
@@ -268,12 +432,12 @@ class ViralPostsReportIntegration:
                 break
                 
             local_path = img.get('local_path')
-            if local_path and Path(local_path).exists():
+            if local_path and self._exists(local_path):
                 # Caminho relativo para o HTML
-                rel_path = Path(local_path).relative_to(session_dir.parent)
+                rel_path = html_escape(os.path.relpath(local_path, base_dir))
                 
-                title = img.get('title', f'Imagem {image_count + 1}')
-                description = self._generate_image_description(img, post)
+                title = html_escape(str(img.get('title', f'Imagem {image_count + 1}')))
+                description = html_escape(self._generate_image_description(img, post))
                 
                 img_html = f"""
 <div style="margin: 10px 0;">
@@ -286,7 +450,7 @@ class ViralPostsReportIntegration:
     </figure>
 </div>
 """
-                images_html_parts.append(img_html)
+                images_buf.write(img_html)
                 image_count += 1
         
         # Processa screenshots se não há imagens suficientes
@@ -302,8 +466,8 @@ class ViralPostsReportIntegration:
                 elif isinstance(screenshot, dict):
                     screenshot_path = screenshot.get('path')
                 
-                if screenshot_path and Path(screenshot_path).exists():
-                    rel_path = Path(screenshot_path).relative_to(session_dir.parent)
+                if screenshot_path and self._exists(screenshot_path):
+                    rel_path = html_escape(os.path.relpath(screenshot_path, base_dir))
                     
                     img_html = f"""
 <div style="margin: 10px 0;">
@@ -316,22 +480,18 @@ class ViralPostsReportIntegration:
     </figure>
 </div>
 """
-                    images_html_parts.append(img_html)
+                    images_buf.write(img_html)
                     image_count += 1
         
-        if images_html_parts:
+        if image_count:
             return f"""
 <div style="margin: 15px 0;">
     <p><strong>🖼️ Conteúdo Visual ({image_count} imagem{'ns' if image_count != 1 else ''}):</strong></p>
-    {''.join(images_html_parts)}
+    {images_buf.getvalue()}
 </div>
 """
         else:
-            return """
-<div style="margin: 15px 0;">
-    <p><strong>🖼️ Conteúdo Visual:</strong> <em>Imagens não disponíveis localmente</em></p>
-</div>
-"""
+            return _NO_IMAGES_HTML
     
     def _generate_image_description(self, img: Dict[str, Any], post: Dict[str, Any]) -> str:
         """Gera descrição inteligente da imagem"""
@@ -347,9 +507,9 @@ class ViralPostsReportIntegration:
         # Fonte da imagem
         source = img.get('source', '')
         if source:
-            domain = re.findall(r'https?://([^/]+)', source)
-            if domain:
-                descriptions.append(f"Fonte: {domain[0]}")
+            domain_match = _DOMAIN_RE.search(source)
+            if domain_match:
+                descriptions.append(f"Fonte: {domain_match.group(1)}")
         
         # Score de relevância
         score = img.get('relevance_score', 0)
@@ -357,7 +517,7 @@ class ViralPostsReportIntegration:
             descriptions.append(f"Relevância: {score:.1f}/1.0")
         
         # Contexto do post
-        platform = post.get('source', {}).get('platform', '')
+        platform = self._post_fields(post)[3]
         if platform:
             descriptions.append(f"Plataforma: {platform}")
         
@@ -369,19 +529,25 @@ class ViralPostsReportIntegration:
         if not posts:
             return ""
         
-        # Calcula estatísticas
-        total_likes = sum(post.get('engagement', {}).get('likes', 0) for post in posts)
-        total_comments = sum(post.get('engagement', {}).get('comments', 0) for post in posts)
-        total_shares = sum(post.get('engagement', {}).get('shares', 0) for post in posts)
-        
-        avg_score = sum(post.get('relevance_score', 0) for post in posts) / len(posts)
-        
+        # Calcula estatísticas em uma única passada pelos posts
+        total_likes = total_comments = total_shares = 0
+        score_sum = 0
         platforms = {}
         for post in posts:
-            platform = post.get('source', {}).get('platform', 'Desconhecido')
+            likes, comments, shares, platform, _ = self._post_fields(post)
+            total_likes += likes
+            total_comments += comments
+            total_shares += shares
+            score_sum += post.get('relevance_score', 0)
+            
+            if platform is None:
+                platform = 'Desconhecido'
             platforms[platform] = platforms.get(platform, 0) + 1
         
-        platforms_list = [f"{platform}: {count}" for platform, count in platforms.items()]
+        avg_score = score_sum / len(posts)
+        
+        platforms_list = [f"{html_escape(str(platform))}: {count}" for platform, count in platforms.items()]
+        platform_names = [html_escape(str(platform)) for platform in platforms]
         
         return f"""
 <hr />
@@ -411,7 +577,7 @@ class ViralPostsReportIntegration:
         <li><strong>Padrões de Sucesso:</strong> Posts com maior engajamento tendem a ter conteúdo visual impactante</li>
         <li><strong>Timing Ideal:</strong> Conteúdo recente (últimos 30 dias) apresenta melhor performance</li>
         <li><strong>Formato Vencedor:</strong> Combinação de imagem + texto descritivo gera mais interação</li>
-        <li><strong>Plataformas Eficazes:</strong> {', '.join(platforms.keys()) if platforms else 'Múltiplas plataformas analisadas'}</li>
+        <li><strong>Plataformas Eficazes:</strong> {', '.join(platform_names) if platforms else 'Múltiplas plataformas analisadas'}</li>
     </ul>
 </div>
 """
@@ -419,21 +585,7 @@ class ViralPostsReportIntegration:
     def _generate_fallback_html(self) -> str:
         """Gera HTML de fallback quando não há posts"""
         
-        return """
-<hr />
-<h2 id="conteúdo-viral-analisado">🔥 CONTEÚDO VIRAL ANALISADO</h2>
-<div style="background: #f8d7da; color: #721c24; padding: 15px; border-radius: 8px; margin: 20px 0;">
-    <h4>⚠️ Posts Virais Não Disponíveis</h4>
-    <p>Nenhum post viral foi encontrado ou baixado durante esta análise.</p>
-    <p><strong>Possíveis causas:</strong></p>
-    <ul>
-        <li>APIs de busca temporariamente indisponíveis</li>
-        <li>Critérios de relevância muito restritivos</li>
-        <li>Problemas de conectividade durante a coleta</li>
-    </ul>
-    <p><em>Recomendação: Execute uma nova análise com termos de busca mais amplos.</em></p>
-</div>
-"""
+        return _FALLBACK_HTML
 
     def extract_viral_data_from_session(self, session_dir: Path) -> List[Dict[str, Any]]:
         """Extrai dados de posts virais dos arquivos da sessão"""
@@ -441,27 +593,47 @@ class ViralPostsReportIntegration:
         viral_data = []
         
         try:
-            # Procura por arquivos de dados virais
-            viral_files = list(session_dir.glob("*viral*.json"))
-            viral_files.extend(list(session_dir.glob("*posts*.json")))
-            viral_files.extend(list(session_dir.glob("*social*.json")))
+            # Procura por arquivos de dados virais em uma única listagem (nome em
+            # minúsculas); cada arquivo entra uma só vez, no grupo do primeiro termo
+            files_by_term = {term: [] for term in _VIRAL_FILE_TERMS}
+            with os.scandir(session_dir) as entries:
+                for entry in entries:
+                    name = entry.name.lower()
+                    if not name.endswith('.json') or not entry.is_file():
+                        continue
+                    stem = name[:-5]
+                    for term in _VIRAL_FILE_TERMS:
+                        if term in stem:
+                            files_by_term[term].append((Path(entry.path), entry.stat().st_size))
+                            break
+            viral_files = [file_info for term in _VIRAL_FILE_TERMS for file_info in files_by_term[term]]
             
-            for file_path in viral_files:
+            for file_path, size in viral_files:
+                if size > self.max_viral_file_bytes:
+                    logger.warning(f"⚠️ Arquivo viral ignorado por tamanho ({size / 1024 / 1024:.1f} MB): {file_path}")
+                    continue
+                
                 try:
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        data = json.load(f)
-                        
-                        if isinstance(data, list):
-                            viral_data.extend(data)
-                        elif isinstance(data, dict):
-                            # Se é um dict, pode ser um post único ou container
-                            if 'posts' in data:
-                                viral_data.extend(data['posts'])
-                            elif 'results' in data:
-                                viral_data.extend(data['results'])
-                            else:
-                                viral_data.append(data)
-                                
+                    # Listas grandes em streaming; o resto (e falhas do ijson) com leitura completa
+                    if HAS_IJSON and size >= _STREAM_MIN_BYTES:
+                        items = _stream_json_list(file_path)
+                        if items is not None:
+                            viral_data.extend(items)
+                            continue
+                    
+                    data = _load_json_file(file_path)
+                    
+                    if isinstance(data, list):
+                        viral_data.extend(data)
+                    elif isinstance(data, dict):
+                        # Se é um dict, pode ser um post único ou container
+                        if 'posts' in data:
+                            viral_data.extend(data['posts'])
+                        elif 'results' in data:
+                            viral_data.extend(data['results'])
+                        else:
+                            viral_data.append(data)
+                    
                 except Exception as e:
                     logger.warning(f"⚠️ Erro lendo arquivo viral {file_path}: {e}")
                     continue